@@ -1,63 +1,90 @@
+import heapq
 import numpy as np
-import pandas as pd
-import ast
+import random
+import QTable
+import Checkpoint
+from World import weather_raster, SUNNY, WEATHER_PENALTY, STEP_REWARD, BIRD_REWARD, BIRD_ADJACENT_REWARD
 
 
 class Agent:
     # learning_rate: learning rate, reward_decay: discount factor, epsilon: epsilon-greedy factor, weather: 'normal' or 'sunny'
-    def __init__(self, actions, learning_rate=0.01, reward_decay=0.9, epsilon=0.01, weather='normal', cell_weather=None, env=None):
+    # gridNum/gridWidth default to the environment's; dtype selects the Q-table precision (float64 or float32)
+    # tiled: use a QTable.TiledQTable that only allocates visited tiles (default: only above QTable.DENSE_LIMIT cells)
+    # planning_steps: simulated backups from a learned model after every real step (0 disables planning);
+    # planning: 'dyna' (Dyna-Q, random observed pairs) or 'sweeping' (prioritized sweeping, largest TD errors first);
+    # priority_threshold: smallest TD error queued for prioritized sweeping
+    def __init__(self, actions, learning_rate=0.01, reward_decay=0.9, epsilon=0.01, weather='normal', cell_weather=None, env=None,
+                 gridNum=None, gridWidth=None, dtype=np.float64, verbose=True, tiled=None, planning_steps=0, planning='dyna',
+                 priority_threshold=1e-4):
         self.lr = learning_rate
         self.gamma = reward_decay
-        self.actions = actions
+        self.actions = list(actions)
         self.epsilon = epsilon
         self.weather = weather
         self.cell_weather = cell_weather if cell_weather is not None else {}
         self.env = env  # Environment reference for collision detection
-        # q_table stores Q-values for state-action pairs
-        self.q_table = pd.DataFrame(columns=self.actions)
+        # Bird occupancy counts of the environment (Hazards.BirdScheduler) for O(1) adjacency checks, if it has them
+        self._birds = getattr(getattr(env, 'world', env), 'birds', None)
+        self.gridNum = gridNum if gridNum is not None else (env.gridNum if env else 12)
+        self.gridWidth = gridWidth if gridWidth is not None else (env.gridWidth if env else 80)
+        self.verbose = verbose
+        # q_table stores Q-values for state-action pairs: one preallocated row per cell plus 'finished',
+        # one column per action (actions are the integers 0..n-1, as in range(env.actions_num))
+        self.finished_index = self.gridNum * self.gridNum
+        if tiled is None:
+            tiled = self.gridNum * self.gridNum > QTable.DENSE_LIMIT
+        if tiled:
+            self.q_table = QTable.TiledQTable(self.gridNum, len(self.actions), dtype=dtype)
+        else:
+            self.q_table = np.zeros((QTable.state_count(self.gridNum), len(self.actions)), dtype=dtype)
+        # Weather code and weather penalty per state index, computed once instead of per update;
+        # plain lists on small grids (fastest to index), compact arrays on large ones
+        if env is not None and getattr(env, 'weather_codes', None) is not None and env.gridNum == self.gridNum:
+            weather = env.weather_codes.ravel()
+        else:
+            weather = weather_raster(self.cell_weather, self.gridNum).ravel()
+        self._weather = weather if tiled else weather.tolist()
+        self._weather_penalty = WEATHER_PENALTY.astype(np.int8)[weather] if tiled else WEATHER_PENALTY[weather].tolist()
+        if planning not in ('sweeping', 'dyna'):
+            raise ValueError('Unknown planning mode: %r' % (planning,))
+        self.planning_steps = planning_steps
+        self.planning = planning
+        self.priority_threshold = priority_threshold
+        # Learned deterministic model: (state, action) -> (shaped reward, next state) as last observed, the
+        # (state, action) pairs observed to lead into each state, and the prioritized-sweeping queue.
+        # Birds move, so the model keeps only the static part of the reward; planned backups add the collision
+        # and adjacency terms for where the birds are now
+        self.model = {}
+        self._observed = []
+        self._predecessors = {}
+        self._queue = []
+        self._queued = {}
 
     def update_q_table(self, s, a, r, sig):
-        # Normalize states to canonical grid cell keys so the table always stays 144+1 rows
-        state = self._normalize_state(s)
-        next_state = self._normalize_state(sig)
-        self.check_in_qtable(state)
-        if next_state != 'finished':
-            self.check_in_qtable(next_state)
+        state = self.state_index(s)
+        next_state = self.state_index(sig)
 
         reward = r
-        cell_type = 'cloudy'
         col, row = None, None
 
-        # Extract grid position from normalized state
-        if next_state != 'finished':
-            try:
-                coords = ast.literal_eval(next_state)
-                center_x = (coords[0] + coords[2]) / 2.0
-                center_y = (coords[1] + coords[3]) / 2.0
-                gridWidth = self.env.gridWidth if self.env else 80
-                col = int(center_x // gridWidth)
-                row = int(center_y // gridWidth)
-                cell_type = self.cell_weather.get((col, row), 'cloudy')
-            except Exception:
-                pass
-
         # Composite reward adjustment combining buildings, weather, and birds
         # Base reward r already includes: step cost, goal reward, hazard penalty, building penalty
-        
-        # 1. Weather-based adjustments (applied to all rewards)
-        if cell_type == 'sunny' and reward > 0:
-            # Sunny weather boosts positive rewards (e.g., reaching goal)
-            reward = int(reward * 1.5)
-        elif cell_type == 'snow':
-            # Snow applies penalty (worst weather)
-            reward = reward - 5
-        elif cell_type == 'rain':
-            # Rain applies smaller penalty (better than snow, worse than cloudy)
-            reward = reward - 2
-        # cloudy: no change (neutral weather)
-        
+
+        # 1. Weather-based adjustments on the next cell ('finished' counts as cloudy):
+        #    sunny boosts positive rewards by 1.5x, snow -5, rain -2, cloudy unchanged
+        if next_state != self.finished_index:
+            col, row = divmod(next_state, self.gridNum)
+            if self._weather[next_state] == SUNNY and reward > 0:
+                reward = int(reward * 1.5)
+            else:
+                reward = reward + self._weather_penalty[next_state]
+
         # 2. Additional proximity-based risk penalty for birds (optional enhancement)
-        if self.env and col is not None and row is not None:
+        if self._birds is not None and col is not None:
+            # Small penalty for being adjacent to a bird (within Manhattan distance 1)
+            if self._birds.adjacent[next_state]:
+                reward = reward - 3
+        elif self.env and col is not None and row is not None:
             # Check if agent is near any bird (within Manhattan distance 1)
             bird_positions = self._get_bird_grid_positions()
             for bird_col, bird_row in bird_positions:
@@ -66,83 +93,169 @@ class Agent:
                     # Small penalty for being adjacent to bird (soft avoidance)
                     reward = reward - 3
                     break
-        
+
         # 3. Building collision is already in base reward r (from Layout.step)
         #    No additional modification needed here
-        
+
         # Get current q-table value and update
-        q_value = self.q_table.loc[state, a]
-        if next_state != 'finished':
-            q_target = reward + self.gamma * self.q_table.loc[next_state, :].max()
+        q_value = self.q_table[state, a]
+        if next_state != self.finished_index:
+            q_target = reward + self.gamma * self.q_table[next_state].max()
+        else:
+            q_target = reward
+
+        self.q_table[state, a] += self.lr * (q_target - q_value)
+        if self.planning_steps:
+            self._plan(state, a, r, next_state, q_target - q_value)
+
+    def _model_reward(self, reward, next_state):
+        # Static model reward plus the bird terms for the birds' current positions
+        if self._birds is not None and next_state != self.finished_index:
+            if reward == STEP_REWARD + self._weather_penalty[next_state] and self._birds.occupied[next_state]:
+                reward = reward + BIRD_REWARD - STEP_REWARD
+            if self._birds.adjacent[next_state]:
+                reward = reward + BIRD_ADJACENT_REWARD
+        return reward
+
+    def _backup(self, state, a, reward, next_state):
+        # One-step Q-learning backup from the model; returns the TD error before the update
+        reward = self._model_reward(reward, next_state)
+        if next_state != self.finished_index:
+            q_target = reward + self.gamma * self.q_table[next_state].max()
         else:
             q_target = reward
+        delta = q_target - self.q_table[state, a]
+        self.q_table[state, a] += self.lr * delta
+        return delta
+
+    def _plan(self, state, a, r, next_state, delta):
+        """Record the real transition in the model and run planning_steps simulated backups."""
+        reward = STEP_REWARD if r == BIRD_REWARD else r
+        if next_state != self.finished_index:
+            reward = reward + self._weather_penalty[next_state]
+        key = (state, a)
+        if key not in self.model:
+            self._observed.append(key)
+            self._predecessors.setdefault(next_state, set()).add(key)
+        elif self.model[key][1] != next_state:
+            self._predecessors[self.model[key][1]].discard(key)
+            self._predecessors.setdefault(next_state, set()).add(key)
+        self.model[key] = (reward, next_state)
+
+        if self.planning == 'dyna':
+            for _ in range(self.planning_steps):
+                s, act = random.choice(self._observed)
+                r, nxt = self.model[(s, act)]
+                self._backup(s, act, r, nxt)
+            return
+
+        # Prioritized sweeping: back up the pairs with the largest expected change first, then queue the
+        # predecessors of every state whose value moved
+        self._enqueue(key, abs(delta))
+        queue, queued = self._queue, self._queued
+        done = 0
+        while queue and done < self.planning_steps:
+            priority, s, act = heapq.heappop(queue)
+            # Skip entries superseded by a higher-priority push of the same pair
+            if queued.get((s, act)) != -priority:
+                continue
+            del queued[(s, act)]
+            r, nxt = self.model[(s, act)]
+            self._backup(s, act, r, nxt)
+            done += 1
+            best = self.q_table[s].max()
+            for ps, pa in self._predecessors.get(s, ()):
+                pr, _ = self.model[(ps, pa)]
+                pr = self._model_reward(pr, s)
+                self._enqueue((ps, pa), abs(pr + self.gamma * best - self.q_table[ps, pa]))
+
+    def _enqueue(self, key, priority):
+        # Each pair is queued at most once, at its highest pending priority
+        if priority > self.priority_threshold and priority > self._queued.get(key, 0.0):
+            self._queued[key] = priority
+            heapq.heappush(self._queue, (-priority, key[0], key[1]))
 
-        self.q_table.loc[state, a] += self.lr * (q_target - q_value)
-    
     def _get_bird_grid_positions(self):
         """Get current grid positions of all birds from environment"""
         if not self.env or not hasattr(self.env, 'blacks'):
             return []
-        # Convert bird canvas coords to grid positions
-        bird_grid_positions = []
-        for black_coords in self.env.blackCoors:
-            if len(black_coords) >= 2:
-                # Take first two coords as representative point
-                cx = (black_coords[0] + black_coords[2]) / 2.0 if len(black_coords) >= 4 else black_coords[0]
-                cy = (black_coords[1] + black_coords[3]) / 2.0 if len(black_coords) >= 4 else black_coords[1]
-                col = int(cx // self.env.gridWidth)
-                row = int(cy // self.env.gridWidth)
-                bird_grid_positions.append((col, row))
-        return bird_grid_positions
+        return [(int(b[0]), int(b[1])) for b in self.env.blacks]
 
     def action_select(self, observation):
-        observation = self._normalize_state(observation)
-        self.check_in_qtable(observation)
+        observation = self.state_index(observation)
         # Epsilon-greedy strategy: choose best action with probability (1 - epsilon)
-        if np.random.uniform() > self.epsilon:
-            state_action = self.q_table.loc[observation, :]
-            # np.max(state_action) is the maximum value in the state-action row; choose among actions with that value
-            action = np.random.choice(state_action[state_action == np.max(state_action)].index)
+        if random.random() > self.epsilon:
+            state_action = self.q_table[observation]
+            # Choose randomly among the actions sharing the maximum value
+            best = np.flatnonzero(state_action == state_action.max())
+            action = int(best[0]) if len(best) == 1 else int(random.choice(best))
         else:
             # Choose a random action
-            action = np.random.choice(self.actions)
+            action = random.choice(self.actions)
 
-        print("Select action: ", ['up', 'down', 'left', 'right'][action])
+        if self.verbose:
+            print("Select action: ", ['up', 'down', 'left', 'right'][action])
         return action
 
     def check_in_qtable(self, state):
-        state = self._normalize_state(state)
-        # Add state to q_table if not present
-        if state not in self.q_table.index:
-            # pandas.DataFrame.append is deprecated; use loc assignment to add a new row
-            # Assigning to a non-existing index will create a new row with values matching columns
-            self.q_table.loc[state] = [0] * len(self.actions)
-
-    def _normalize_state(self, state):
-        """Convert any state representation to a canonical grid cell key."""
-        if state == 'finished':
-            return 'finished'
-
-        coords = None
-        if isinstance(state, list) and len(state) == 4:
-            coords = state
-        elif isinstance(state, str) and state.startswith('['):
-            try:
-                parsed = ast.literal_eval(state)
-                if isinstance(parsed, (list, tuple)) and len(parsed) == 4:
-                    coords = list(parsed)
-            except Exception:
-                coords = None
-
-        if coords is None:
-            return str(state)
-
-        gridWidth = self.env.gridWidth if self.env else 80
-        center_x = (coords[0] + coords[2]) / 2.0
-        center_y = (coords[1] + coords[3]) / 2.0
-        col = int(center_x // gridWidth)
-        row = int(center_y // gridWidth)
-        x0, y0 = col * gridWidth, row * gridWidth
-        x1, y1 = (col + 1) * gridWidth, (row + 1) * gridWidth
-        # Use fixed one-decimal formatting to match canonical keys like "[0.0, 0.0, 80.0, 80.0]"
-        return f"[{x0:.1f}, {y0:.1f}, {x1:.1f}, {y1:.1f}]"
+        """Kept for callers of the old DataFrame API; every state row is preallocated."""
+        self.state_index(state)
+
+    def state_index(self, state):
+        """Integer Q-table row of a state: (col, row) cells, 'finished', int indices or legacy string keys."""
+        if isinstance(state, tuple):
+            return state[0] * self.gridNum + state[1]
+        if isinstance(state, (int, np.integer)):
+            return int(state)
+        if isinstance(state, str):
+            if state == 'finished':
+                return self.finished_index
+            cell = QTable.parse_legacy_key(state, self.gridWidth)
+            if cell is not None:
+                return cell[0] * self.gridNum + cell[1]
+        elif isinstance(state, list) and len(state) in (2, 4):
+            # [col, row] cells or legacy [x0, y0, x1, y1] canvas coordinates
+            if len(state) == 2:
+                return int(state[0]) * self.gridNum + int(state[1])
+            col = int((state[0] + state[2]) / 2.0 // self.gridWidth)
+            row = int((state[1] + state[3]) / 2.0 // self.gridWidth)
+            return col * self.gridNum + row
+        raise ValueError('Unknown state: %r' % (state,))
+
+    def q_frame(self):
+        """Q-table as a DataFrame indexed by legacy string keys (the Qtable.csv layout)."""
+        return QTable.to_frame(self.q_table, self.gridNum, self.gridWidth)
+
+    def save_csv(self, path):
+        QTable.save_csv(self.q_table, path, self.gridNum, self.gridWidth)
+
+    def load_csv(self, path):
+        q_table = QTable.load_csv(path, self.gridNum, self.gridWidth, len(self.actions), self.q_table.dtype)
+        if isinstance(self.q_table, QTable.TiledQTable):
+            q_table = QTable.TiledQTable.from_dense(q_table, self.gridNum, self.q_table.tile)
+        self.q_table = q_table
+
+    def _layout_hashes(self):
+        world = getattr(self.env, 'world', self.env)
+        if world is None:
+            return Checkpoint.NO_HASH, Checkpoint.NO_HASH
+        return Checkpoint.weather_hash(world), Checkpoint.layout_hash(world)
+
+    def save_checkpoint(self, path):
+        """Atomically write the Q-table as a binary Checkpoint, tagged with the environment's layout hashes."""
+        Checkpoint.save(path, self.q_table, self.gridNum, self.gridWidth, *self._layout_hashes())
+
+    def checkpointer(self, path):
+        """Background Checkpoint.AsyncCheckpointer for this agent's grid; pass it q_table to request a write."""
+        return Checkpoint.AsyncCheckpointer(path, self.gridNum, self.gridWidth, *self._layout_hashes())
+
+    def load_checkpoint(self, path):
+        """Map a binary Checkpoint copy-on-write as the Q-table; returns its header."""
+        q_table, header = Checkpoint.load(path, mode='c')
+        if header['gridNum'] != self.gridNum or header['actions'] != len(self.actions):
+            raise ValueError('%s: checkpoint is for a %dx%d grid with %d actions' % (
+                path, header['gridNum'], header['gridNum'], header['actions']))
+        if isinstance(self.q_table, QTable.TiledQTable):
+            q_table = QTable.TiledQTable.from_dense(q_table, self.gridNum, self.q_table.tile)
+        self.q_table = q_table
+        return header
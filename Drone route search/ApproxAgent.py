@@ -0,0 +1,181 @@
+import numpy as np
+import random
+from World import ACTION_DELTAS, SUNNY, WEATHER_PENALTY, WEATHER_TYPES, BIRD_ADJACENT_REWARD
+
+
+class ReplayBuffer:
+    # Experience replay in preallocated ring arrays: feature vectors of s and s', action, shaped reward and
+    # whether s' is terminal. Once full, the oldest transitions are overwritten.
+    def __init__(self, capacity, n_features, seed=None):
+        self.capacity = capacity
+        self.features = np.zeros((capacity, n_features), dtype=np.float32)
+        self.next_features = np.zeros((capacity, n_features), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.terminal = np.zeros(capacity, dtype=bool)
+        self.rng = np.random.default_rng(seed)
+        self.size = 0
+        self._next = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, phi, a, r, next_phi, terminal):
+        i = self._next
+        self.features[i] = phi
+        self.next_features[i] = next_phi
+        self.actions[i] = a
+        self.rewards[i] = r
+        self.terminal[i] = terminal
+        self._next = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """Indices of a uniform minibatch (with replacement) of stored transitions."""
+        return self.rng.integers(0, self.size, batch_size)
+
+
+class ApproxAgent:
+    # Q-learning with a linear Q-function, Q(s, a) = weights[a] . phi(s), instead of a row per cell.
+    # phi(s) only uses grid-size-independent quantities, so weights carry over between layouts and grid sizes:
+    #   RBFs over the normalised (col, row) position, the signed normalised offset to the goal and the normalised
+    #   Manhattan distance to it, the cell's weather (one-hot), closeness of the nearest bird, and per move
+    #   direction whether it is blocked, leads into or next to a bird, reaches the goal or gets closer to it;
+    #   plus a bias.
+    # Transitions go into a ReplayBuffer; every train_every updates a minibatch of batch_size is replayed
+    # against a target copy of the weights that is refreshed every target_every minibatches.
+    # Same action_select/update_q_table interface (and reward shaping) as Agent, so main.start() can drive it
+    # (with qtable_path=None and csv_path=None; save_weights/load_weights persist the model).
+    def __init__(self, actions, env, learning_rate=0.1, reward_decay=0.9, epsilon=0.01, rbf_centers=5, rbf_width=None,
+                 buffer_size=10000, batch_size=32, train_every=1, target_every=100, seed=None, verbose=True):
+        self.lr = learning_rate
+        self.gamma = reward_decay
+        self.actions = list(actions)
+        self.epsilon = epsilon
+        self.verbose = verbose
+        self.batch_size = batch_size
+        self.train_every = train_every
+        self.target_every = target_every
+        self._deltas = [tuple(d) for d in ACTION_DELTAS.tolist()]
+        centers = np.linspace(0.0, 1.0, rbf_centers)
+        self.rbf_centers = np.array([(x, y) for x in centers for y in centers])
+        self.rbf_width = rbf_width if rbf_width is not None else 1.0 / max(rbf_centers - 1, 1)
+        # RBFs, goal offset (2), goal distance (1), weather one-hot, bird closeness (1),
+        # blocked/bird/near-bird/goal/closer per move, bias
+        self.n_features = len(self.rbf_centers) + 3 + len(WEATHER_TYPES) + 1 + 5 * len(ACTION_DELTAS) + 1
+        self.weights = np.zeros((len(self.actions), self.n_features))
+        self.target_weights = self.weights.copy()
+        self.memory = ReplayBuffer(buffer_size, self.n_features, seed=seed)
+        self.updates = 0
+        self.minibatches = 0
+        # (observation, phi) of the last action_select, so update_q_table stores the features the action was
+        # chosen on rather than recomputing them after env.step has moved the birds
+        self._last_phi = (None, None)
+        self.set_env(env)
+
+    def set_env(self, env):
+        """Switch to another environment (layout or grid size) keeping the learned weights."""
+        self.env = env
+        world = getattr(env, 'world', env)
+        self.world = world
+        self.gridNum = world.gridNum
+        self.finished_index = world.finished_index
+        self._terminal_phi = np.zeros(self.n_features)
+        self._last_phi = (None, None)
+
+    def features(self, state):
+        """phi(state) for a (col, row) cell; 'finished' maps to the zero vector."""
+        if state == 'finished':
+            return self._terminal_phi
+        world = self.world
+        G = world.gridNum
+        col, row = int(state[0]), int(state[1])
+        scale = float(max(G - 1, 1))
+        pos = np.array([col / scale, row / scale])
+        d2 = ((self.rbf_centers - pos) ** 2).sum(axis=1)
+        rbf = np.exp(-d2 / (2.0 * self.rbf_width ** 2))
+        goal_col, goal_row = world.goal_pos
+        distance = abs(goal_col - col) + abs(goal_row - row)
+        goal = ((goal_col - col) / scale, (goal_row - row) / scale, distance / (2 * scale))
+        weather = np.zeros(len(WEATHER_TYPES))
+        weather[world.weather_codes[col, row]] = 1.0
+        birds = world.blacks
+        nearest = int((np.abs(birds[:, 0] - col) + np.abs(birds[:, 1] - row)).min()) if len(birds) else 2 * G
+        # One row per move direction: blocked, into a bird, next to a bird, onto the goal, closer to the goal
+        moves = np.zeros((5, len(ACTION_DELTAS)))
+        for a, (dcol, drow) in enumerate(self._deltas):
+            ncol, nrow = col + dcol, row + drow
+            if not (0 <= ncol < G and 0 <= nrow < G) or world.building_mask[ncol, nrow]:
+                moves[0, a] = 1.0
+                continue
+            index = ncol * G + nrow
+            moves[1, a] = world.birds.occupied[index] > 0
+            moves[2, a] = world.birds.adjacent[index] > 0
+            moves[3, a] = (ncol, nrow) == world.goal_pos
+            moves[4, a] = abs(goal_col - ncol) + abs(goal_row - nrow) < distance
+        return np.concatenate([rbf, goal, weather, (1.0 / (1.0 + nearest),), moves.ravel(), (1.0,)])
+
+    def q_values(self, state):
+        return self.weights @ self.features(state)
+
+    def action_select(self, observation):
+        # Epsilon-greedy strategy: choose best action with probability (1 - epsilon)
+        phi = self.features(observation)
+        self._last_phi = (observation, phi)
+        if random.random() > self.epsilon:
+            state_action = self.weights @ phi
+            # Choose randomly among the actions sharing the maximum value
+            best = np.flatnonzero(state_action == state_action.max())
+            action = int(best[0]) if len(best) == 1 else int(random.choice(best))
+        else:
+            action = random.choice(self.actions)
+
+        if self.verbose:
+            print("Select action: ", ['up', 'down', 'left', 'right'][action])
+        return action
+
+    def shaped_reward(self, r, sig):
+        """Agent.update_q_table's reward shaping: weather of the next cell and bird adjacency."""
+        if sig == 'finished':
+            return r
+        col, row = sig
+        code = self.world.weather_codes[col, row]
+        if code == SUNNY and r > 0:
+            reward = int(r * 1.5)
+        else:
+            reward = r + int(WEATHER_PENALTY[code])
+        if self.world.birds.adjacent[col * self.gridNum + row]:
+            reward += BIRD_ADJACENT_REWARD
+        return reward
+
+    def update_q_table(self, s, a, r, sig):
+        # Store the transition, then learn from a replayed minibatch rather than from this sample alone
+        observation, phi = self._last_phi
+        if phi is None or observation != s:
+            phi = self.features(s)
+        self.memory.add(phi, a, self.shaped_reward(r, sig), self.features(sig), sig == 'finished')
+        self.updates += 1
+        if self.updates % self.train_every == 0 and len(self.memory) >= self.batch_size:
+            self.replay()
+
+    def replay(self):
+        """One semi-gradient step on a minibatch sampled from the replay buffer."""
+        m = self.memory
+        batch = m.sample(self.batch_size)
+        phi, next_phi, actions = m.features[batch], m.next_features[batch], m.actions[batch]
+        next_q = (next_phi @ self.target_weights.T).max(axis=1)
+        target = m.rewards[batch] + np.where(m.terminal[batch], 0.0, self.gamma * next_q)
+        td = target - (phi * self.weights[actions]).sum(axis=1)
+        grad = np.zeros_like(self.weights)
+        np.add.at(grad, actions, td[:, None] * phi)
+        self.weights += self.lr * grad / self.batch_size
+        self.minibatches += 1
+        if self.minibatches % self.target_every == 0:
+            self.target_weights[:] = self.weights
+
+    def save_weights(self, path):
+        np.save(path, self.weights)
+
+    def load_weights(self, path):
+        self.weights = np.load(path)
+        self.target_weights = self.weights.copy()
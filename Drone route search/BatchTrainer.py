@@ -0,0 +1,187 @@
+import itertools
+import numpy as np
+from World import GridWorld, STEP_REWARD, BIRD_REWARD, BIRD_ADJACENT_REWARD
+
+
+class BatchTrainer:
+    # Trains N independent tabular Q-learners, each in its own copy of a GridWorld, in lockstep with array ops.
+    # worlds: list of GridWorld sharing gridNum and bird count; learning_rate/reward_decay/epsilon: scalars or length-N arrays
+    # Every distinct world gets a copy of its Hazards.BirdScheduler, so birds move on that world's bird_every clock
+    # and bird_seed exactly as they would in a single-world run; environments on the same world (e.g. a sweep)
+    # share its copy, as their birds would move identically anyway. seed only drives action selection
+    def __init__(self, worlds, learning_rate=0.01, reward_decay=0.9, epsilon=0.01, seed=None, dtype=np.float64):
+        self.n = len(worlds)
+        self.gridNum = worlds[0].gridNum
+        self.actions_num = worlds[0].actions_num
+        if any(w.gridNum != self.gridNum or len(w.blacks) != len(worlds[0].blacks) for w in worlds):
+            raise ValueError('All worlds must share gridNum and bird count')
+        G = self.gridNum
+        self.lr = np.broadcast_to(np.asarray(learning_rate, dtype=dtype), (self.n,)).copy()
+        self.gamma = np.broadcast_to(np.asarray(reward_decay, dtype=dtype), (self.n,)).copy()
+        self.epsilon = np.broadcast_to(np.asarray(epsilon, dtype=dtype), (self.n,)).copy()
+        self.rng = np.random.default_rng(seed)
+
+        # Static per-layout tables from GridWorld.build_tables, stacked as flat (N * rows, actions) arrays
+        # addressed by _row_base + state; rows match Agent.q_table (the last row is 'finished')
+        self.finished_index = G * G
+        rows = G * G + 1
+        self.transitions = np.concatenate([w.transitions for w in worlds])
+        self.rewards = np.concatenate([w.rewards for w in worlds])
+        self.shaped_rewards = np.concatenate([w.shaped_rewards for w in worlds])
+        self.blocked_moves = np.concatenate([w.blocked_moves for w in worlds])
+        self._row_base = np.arange(self.n) * rows
+        self.start = np.array([w.cell_index(w.start_pos) for w in worlds])
+        schedulers = {}
+        for w in worlds:
+            schedulers.setdefault(id(w.birds), w.birds)
+        index = {key: i for i, key in enumerate(schedulers)}
+        self._bird_of = np.array([index[id(w.birds)] for w in worlds])
+        self.bird_schedulers = [birds.clone() for birds in schedulers.values()]
+        # Trainer step at which each scheduler's birds next move (never when move_every is 0)
+        self._bird_clock = 0
+        self._bird_start = np.array([b.steps for b in self.bird_schedulers], dtype=np.int64)
+        self._bird_every = np.array([b.move_every or 0 for b in self.bird_schedulers], dtype=np.int64)
+        self._next_bird_move = np.where(self._bird_every > 0,
+                                        self._bird_every - self._bird_start % np.maximum(self._bird_every, 1),
+                                        np.iinfo(np.int64).max)
+        self._next_bird_due = int(self._next_bird_move.min())
+
+        # One Q-table per environment; _q is the matching flat view
+        self.q_tables = np.zeros((self.n, rows, self.actions_num), dtype=dtype)
+        self._q = self.q_tables.reshape(-1, self.actions_num)
+        self.pos = self.start.copy()
+        # Bird occupancy and the Manhattan-distance-1 zone around birds, as (schedulers, cells + 1) masks copied
+        # from the schedulers; the extra column is 'finished', which is never occupied
+        self.bird_occupied = np.zeros((len(self.bird_schedulers), rows), dtype=bool)
+        self.bird_adjacent = np.zeros((len(self.bird_schedulers), rows), dtype=bool)
+        self._refresh_birds(range(len(self.bird_schedulers)))
+
+    @classmethod
+    def sweep(cls, world, learning_rates=(0.01,), reward_decays=(0.9,), epsilons=(0.01,), **kwargs):
+        """One environment per (lr, gamma, epsilon) combination, all on copies of the same layout."""
+        grid = list(itertools.product(learning_rates, reward_decays, epsilons))
+        lr, gamma, eps = (np.array(v) for v in zip(*grid))
+        trainer = cls([world] * len(grid), learning_rate=lr, reward_decay=gamma, epsilon=eps, **kwargs)
+        trainer.configs = grid
+        return trainer
+
+    def _refresh_birds(self, schedulers):
+        for i in schedulers:
+            birds = self.bird_schedulers[i]
+            self.bird_occupied[i] = birds.occupied_array > 0
+            self.bird_adjacent[i] = birds.adjacent_array > 0
+
+    def tick_birds(self):
+        # One simulation step on every scheduler's clock, as BirdScheduler.tick() at the start of
+        # GridWorld.step; schedulers are only called on the steps where their birds move
+        self._bird_clock += 1
+        if self._bird_clock < self._next_bird_due:
+            return
+        due = np.flatnonzero(self._next_bird_move == self._bird_clock)
+        for i in due.tolist():
+            birds = self.bird_schedulers[i]
+            birds.steps = int(self._bird_start[i]) + self._bird_clock
+            birds.move()
+        self._next_bird_move[due] += self._bird_every[due]
+        self._next_bird_due = int(self._next_bird_move.min())
+        self._refresh_birds(due.tolist())
+
+    def select_actions(self):
+        q = self._q[self._row_base + self.pos]
+        # Greedy with random tie-breaking: random keys only on the maximal actions, then argmax
+        keys = self.rng.random(q.shape) * (q == q.max(axis=1, keepdims=True))
+        actions = keys.argmax(axis=1)
+        explore = self.rng.random(self.n) <= self.epsilon
+        actions[explore] = self.rng.integers(0, self.actions_num, explore.sum())
+        return actions
+
+    def step(self, actions):
+        """Advance every environment; returns (next_state, reward, shaped_reward, done, finished) arrays."""
+        self.tick_birds()
+        rows = self._row_base + self.pos
+        nxt = self.transitions[rows, actions]
+        reward = self.rewards[rows, actions]
+        finished = nxt == self.finished_index
+        # Birds are the only dynamic part: entering an occupied cell (not through a blocked move) ends the episode
+        birds = self._bird_of
+        hit = ~self.blocked_moves[rows, actions] & self.bird_occupied[birds, nxt]
+        reward = np.where(hit, BIRD_REWARD, reward)
+        # Weather shaping is precomputed; add the bird terms Agent.update_q_table applies on top
+        shaped = (self.shaped_rewards[rows, actions] + np.where(hit, BIRD_REWARD - STEP_REWARD, 0)
+                  + np.where(self.bird_adjacent[birds, nxt], BIRD_ADJACENT_REWARD, 0))
+        self.pos = nxt
+        return nxt, reward, shaped, finished | hit, finished
+
+    def update(self, state, actions, shaped, nxt, finished, active):
+        q = self._q
+        rows = self._row_base + state
+        next_rows = self._row_base + nxt
+        target = shaped + np.where(finished, 0.0, self.gamma * q[next_rows].max(axis=1))
+        # Environments that already completed their episodes keep stepping but no longer learn
+        q[rows, actions] += np.where(active, self.lr, 0.0) * (target - q[rows, actions])
+
+    def train(self, episodes=200, max_steps=None):
+        """Run every environment for the given number of episodes; returns per-environment metrics arrays.
+
+        max_steps truncates an episode (counted as a failure) so a stuck learner cannot stall the batch.
+        """
+        n = self.n
+        episodes_done = np.zeros(n, dtype=np.int64)
+        ep_reward = np.zeros(n)
+        ep_steps = np.zeros(n, dtype=np.int64)
+        reward_sum = np.zeros(n)
+        reward_sq_sum = np.zeros(n)
+        steps_sum = np.zeros(n)
+        success_count = np.zeros(n, dtype=np.int64)
+        success_steps_sum = np.zeros(n)
+        self.pos = self.start.copy()
+
+        active = episodes_done < episodes
+        while active.any():
+            actions = self.select_actions()
+            state = self.pos
+            nxt, reward, shaped, done, finished = self.step(actions)
+            self.update(state, actions, shaped, nxt, finished, active)
+
+            ep_reward += reward
+            ep_steps += 1
+            if max_steps is not None:
+                done = done | (ep_steps >= max_steps)
+            if done.any():
+                ended = done & active
+                won = finished & active
+                reward_sum[ended] += ep_reward[ended]
+                reward_sq_sum[ended] += ep_reward[ended] ** 2
+                steps_sum[ended] += ep_steps[ended]
+                success_count[won] += 1
+                success_steps_sum[won] += ep_steps[won]
+                episodes_done[ended] += 1
+                ep_reward[done] = 0
+                ep_steps[done] = 0
+                self.pos[done] = self.start[done]
+                active = episodes_done < episodes
+
+        # Same summary as main.start(): population std of episode rewards, success-only step average
+        avg_reward = reward_sum / np.maximum(episodes_done, 1)
+        return {
+            'episodes': episodes_done,
+            'success_rate': success_count / max(episodes, 1),
+            'avg_reward': avg_reward,
+            'avg_steps': steps_sum / np.maximum(episodes_done, 1),
+            'reward_std': np.sqrt(np.maximum(reward_sq_sum / np.maximum(episodes_done, 1) - avg_reward ** 2, 0.0)),
+            'avg_success_steps': success_steps_sum / np.maximum(success_count, 1),
+        }
+
+
+if __name__ == "__main__":
+    import time
+    world = GridWorld()
+    trainer = BatchTrainer.sweep(world, learning_rates=(0.01, 0.05, 0.1, 0.5), reward_decays=(0.8, 0.9, 0.99),
+                                 epsilons=(0.01, 0.05, 0.1), seed=0)
+    t0 = time.perf_counter()
+    metrics = trainer.train(episodes=200, max_steps=2000)
+    print('Trained %d agents in %.2fs' % (trainer.n, time.perf_counter() - t0))
+    for i, (lr, gamma, eps) in enumerate(trainer.configs):
+        print('lr=%.2f gamma=%.2f eps=%.2f  success %.2f%%  R %.3f  std %.3f  steps %.2f  success steps %.2f' % (
+            lr, gamma, eps, metrics['success_rate'][i] * 100, metrics['avg_reward'][i], metrics['reward_std'][i],
+            metrics['avg_steps'][i], metrics['avg_success_steps'][i]))
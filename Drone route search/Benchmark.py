@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from Agent import Agent
+from Scenario import Scenario
+import main
+
+
+# Headless, seeded benchmarks of the hot paths across grid sizes and building densities. Every result is a
+# flat record keyed by (benchmark, gridNum, density) so two JSON reports can be compared with --compare.
+GRID_SIZES = (12, 64, 256, 1024)
+DENSITIES = (0.05, 0.15)
+
+
+def make_world(gridNum, density, seed=0, cache=None):
+    """Seeded GridWorld with density * gridNum^2 buildings, the default weather quadrants and the usual (9, 9)
+    goal pulled inside small grids; the goal is always reachable. cache is an optional Scenario.ScenarioCache."""
+    random.seed(seed)
+    np.random.seed(seed)
+    params = dict(gridNum=gridNum, num_buildings=int(density * gridNum * gridNum), seed=seed)
+    scenario = cache.generate(**params) if cache is not None else Scenario.generate(**params)
+    return scenario.world(bird_seed=seed)
+
+
+def make_agent(world, **kwargs):
+    return Agent(actions=range(world.actions_num), env=world, verbose=False, **kwargs)
+
+
+def percentiles(samples_ns):
+    """Latency summary in microseconds."""
+    us = np.asarray(samples_ns, dtype=np.float64) / 1000.0
+    return {
+        'mean_us': float(us.mean()),
+        'p50_us': float(np.percentile(us, 50)),
+        'p90_us': float(np.percentile(us, 90)),
+        'p99_us': float(np.percentile(us, 99)),
+    }
+
+
+def bench_step(world, n=100000, seed=0):
+    """GridWorld.step throughput (what InitLayout.step delegates to) under uniformly random actions."""
+    actions = np.random.default_rng(seed).integers(0, world.actions_num, n).tolist()
+    world.reset()
+    step, reset = world.step, world.reset
+    t0 = time.perf_counter()
+    for action in actions:
+        if step(action)[2]:
+            reset()
+    elapsed = time.perf_counter() - t0
+    return {'steps': n, 'seconds': elapsed, 'steps_per_sec': n / elapsed}
+
+
+def bench_agent(world, agent, n=20000):
+    """Per-call latency of Agent.action_select and Agent.update_q_table on a live trajectory."""
+    clock = time.perf_counter_ns
+    select_ns = []
+    update_ns = []
+    observation = world.reset()
+    for _ in range(n):
+        t0 = clock()
+        action = agent.action_select(observation)
+        t1 = clock()
+        next_observation, reward, done = world.step(action)
+        t2 = clock()
+        agent.update_q_table(observation, action, reward, next_observation)
+        t3 = clock()
+        select_ns.append(t1 - t0)
+        update_ns.append(t3 - t2)
+        observation = world.reset() if done else next_observation
+    return {'action_select': percentiles(select_ns), 'update_q_table': percentiles(update_ns)}
+
+
+def bench_checkpoint(agent, repeats=5):
+    """Best-of-repeats time to save and memory-map a binary checkpoint of the agent's Q-table."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'Qtable.bin')
+        save_s, load_s = [], []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            agent.save_checkpoint(path)
+            t1 = time.perf_counter()
+            agent.load_checkpoint(path)
+            # Touch every page so the load time includes reading the data, not just mapping it
+            float(np.asarray(agent.q_table).sum())
+            load_s.append(time.perf_counter() - t1)
+            save_s.append(t1 - t0)
+        size = os.path.getsize(path)
+    return {'bytes': size, 'save_s': min(save_s), 'load_s': min(load_s)}
+
+
+def bench_training(world, agent, episodes=200, max_steps=2000):
+    """Wall time of main.start() without checkpointing; episodes are truncated at max_steps."""
+    t0 = time.perf_counter()
+    metrics = main.start(world, agent, TOTAL_EXPLORE_EPOCH=episodes, qtable_path=None, csv_path=None,
+                         max_steps=max_steps, verbose=False)
+    elapsed = time.perf_counter() - t0
+    steps = metrics['avg_steps'] * metrics['episodes']
+    return {'episodes': episodes, 'seconds': elapsed, 'steps_per_sec': steps / elapsed if elapsed else 0.0,
+            'success_rate': metrics['success_rate']}
+
+
+def run(grid_sizes=GRID_SIZES, densities=DENSITIES, seed=0, steps=100000, agent_steps=20000, episodes=200, max_steps=2000,
+        benchmarks=('step', 'agent', 'checkpoint', 'training'), log=print, cache=None):
+    """Run the selected benchmarks for every (grid size, density); returns the JSON-ready report."""
+    results = []
+    for gridNum in grid_sizes:
+        for density in densities:
+            def record(name, values):
+                results.append(dict(benchmark=name, gridNum=gridNum, density=density, **values))
+                log('%-10s G=%-5d density=%.2f %s' % (name, gridNum, density, json.dumps(values)))
+            if 'step' in benchmarks:
+                record('step', bench_step(make_world(gridNum, density, seed, cache), steps, seed))
+            if 'agent' in benchmarks:
+                world = make_world(gridNum, density, seed, cache)
+                record('agent', bench_agent(world, make_agent(world), agent_steps))
+            if 'checkpoint' in benchmarks:
+                world = make_world(gridNum, density, seed, cache)
+                agent = make_agent(world)
+                bench_agent(world, agent, agent_steps)
+                record('checkpoint', bench_checkpoint(agent))
+            if 'training' in benchmarks:
+                world = make_world(gridNum, density, seed, cache)
+                record('training', bench_training(world, make_agent(world), episodes, max_steps))
+    return {
+        'meta': {
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def _flatten(record, prefix=''):
+    # {'a': {'b': 1}} -> {'a.b': 1}, numeric leaves only
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, prefix + key + '.'))
+        elif isinstance(value, (int, float)) and key not in ('gridNum', 'density'):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(old, new):
+    """(key, metric, old value, new value, new / old) for every metric present in both reports."""
+    old_index = {(r['benchmark'], r['gridNum'], r['density']): _flatten(r) for r in old['results']}
+    rows = []
+    for r in new['results']:
+        key = (r['benchmark'], r['gridNum'], r['density'])
+        if key not in old_index:
+            continue
+        for metric, value in _flatten(r).items():
+            before = old_index[key].get(metric)
+            if before is not None:
+                ratio = value / before if before else (1.0 if value == before else float('inf'))
+                rows.append((key, metric, before, value, ratio))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Headless throughput and latency benchmarks')
+    parser.add_argument('--grid-num', type=int, nargs='+', default=list(GRID_SIZES))
+    parser.add_argument('--density', type=float, nargs='+', default=list(DENSITIES))
+    parser.add_argument('--bench', nargs='+', default=['step', 'agent', 'checkpoint', 'training'],
+                        choices=['step', 'agent', 'checkpoint', 'training'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--steps', type=int, default=100000)
+    parser.add_argument('--agent-steps', type=int, default=20000)
+    parser.add_argument('--episodes', type=int, default=200)
+    parser.add_argument('--max-steps', type=int, default=2000)
+    parser.add_argument('--out', help='write the JSON report here')
+    parser.add_argument('--compare', help='earlier JSON report to compare against')
+    parser.add_argument('--scenario-cache', help='directory of cached scenarios to reuse between runs')
+    args = parser.parse_args()
+    cache = None
+    if args.scenario_cache:
+        from Scenario import ScenarioCache
+        cache = ScenarioCache(args.scenario_cache)
+    report = run(args.grid_num, args.density, args.seed, args.steps, args.agent_steps, args.episodes, args.max_steps,
+                 args.bench, cache=cache)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for (name, gridNum, density), metric, before, after, ratio in compare(baseline, report):
+            print('%-10s G=%-5d density=%.2f %-24s %12.4g -> %12.4g  x%.3f' % (name, gridNum, density, metric, before,
+                                                                               after, ratio))
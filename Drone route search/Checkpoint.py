@@ -0,0 +1,206 @@
+import argparse
+import atexit
+import hashlib
+import os
+import struct
+import threading
+import numpy as np
+import QTable
+
+
+# Binary Q-table checkpoint: a 64-byte header followed by the raw C-order (states, actions) array, so a
+# checkpoint loads zero-copy with np.memmap. Header fields (little-endian):
+#   magic 'DRQT', version, gridNum, gridWidth, action count, state count, dtype string (e.g. '<f8'),
+#   16-byte hash of the weather raster, 16-byte hash of the building layout
+MAGIC = b'DRQT'
+VERSION = 1
+HEADER_SIZE = 64
+_HEADER = struct.Struct('<4sIIIIQ4s16s16s')
+NO_HASH = bytes(16)
+
+
+def raster_hash(raster):
+    """16-byte digest of a raster's shape and contents."""
+    raster = np.ascontiguousarray(raster)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(raster.shape).encode())
+    digest.update(raster.tobytes())
+    return digest.digest()
+
+
+def weather_hash(world):
+    return raster_hash(world.weather_codes)
+
+
+def layout_hash(world):
+    return raster_hash(world.building_mask)
+
+
+def save(path, q_table, gridNum, gridWidth, weather=NO_HASH, layout=NO_HASH):
+    """Write a checkpoint atomically: write and fsync a temporary file next to path, then rename over it."""
+    q_table = np.ascontiguousarray(np.asarray(q_table))
+    dtype = q_table.dtype.newbyteorder('<')
+    header = _HEADER.pack(MAGIC, VERSION, gridNum, gridWidth, q_table.shape[1], q_table.shape[0],
+                          dtype.str.encode(), weather, layout)
+    tmp = '%s.tmp-%d' % (path, os.getpid())
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(header.ljust(HEADER_SIZE, b'\0'))
+            q_table.astype(dtype, copy=False).tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        raise ValueError('%s: truncated checkpoint header' % path)
+    magic, version, gridNum, gridWidth, n_actions, n_states, dtype, weather, layout = _HEADER.unpack_from(raw)
+    if magic != MAGIC:
+        raise ValueError('%s: not a Q-table checkpoint' % path)
+    if version != VERSION:
+        raise ValueError('%s: unsupported checkpoint version %d' % (path, version))
+    return {
+        'gridNum': gridNum,
+        'gridWidth': gridWidth,
+        'actions': n_actions,
+        'states': n_states,
+        'dtype': np.dtype(dtype.rstrip(b'\0').decode()),
+        'weather_hash': weather,
+        'layout_hash': layout,
+    }
+
+
+def load(path, mode='r'):
+    """(Q-table as an np.memmap over the file, header dict). mode 'r' is read-only, 'c' copy-on-write."""
+    header = read_header(path)
+    q_table = np.memmap(path, dtype=header['dtype'], mode=mode, offset=HEADER_SIZE,
+                        shape=(header['states'], header['actions']))
+    return q_table, header
+
+
+class AsyncCheckpointer:
+    # Writes checkpoints of one Q-table on a background thread so training never waits on disk.
+    # request() copies the table (a dense array, or only the allocated tiles of a TiledQTable, which the writer
+    # densifies) and hands the copy to the writer; while a write is in flight further requests only mark the
+    # table dirty (no copy), and the newest state is copied once the writer is free again. So at most one write
+    # is in flight and one snapshot is held. flush() waits until the latest requested state is on disk; close()
+    # (also run at interpreter exit) flushes and stops the thread. Write errors surface from flush() and close().
+    def __init__(self, path, gridNum, gridWidth, weather=NO_HASH, layout=NO_HASH):
+        self.path = path
+        self.meta = (gridNum, gridWidth, weather, layout)
+        self.writes = 0
+        self._cond = threading.Condition()
+        self._snapshot = None
+        self._busy = False
+        self._dirty = None
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='checkpoint-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def request(self, q_table):
+        """Queue a checkpoint of q_table's current values; returns without waiting for the write."""
+        with self._cond:
+            if self._closed:
+                raise ValueError('checkpoint writer is closed')
+            if self._busy or self._snapshot is not None:
+                # Keep a reference only; it is copied once the writer is idle
+                self._dirty = q_table
+                return
+            self._dirty = None
+            self._submit(q_table)
+
+    def _submit(self, q_table):
+        # Caller holds the lock
+        if isinstance(q_table, QTable.TiledQTable):
+            self._snapshot = q_table.copy()
+        else:
+            self._snapshot = np.array(q_table)
+        self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._snapshot is None and not self._closed:
+                    self._cond.wait()
+                if self._snapshot is None:
+                    return
+                snapshot, self._snapshot = self._snapshot, None
+                self._busy = True
+            try:
+                save(self.path, snapshot, *self.meta)
+            except Exception as e:
+                self._error = e
+            with self._cond:
+                self._busy = False
+                self.writes += 1
+                self._cond.notify_all()
+
+    def flush(self):
+        """Block until everything requested so far, including a pending dirty table, is on disk."""
+        with self._cond:
+            while True:
+                if self._dirty is not None and not self._busy and self._snapshot is None:
+                    q_table, self._dirty = self._dirty, None
+                    self._submit(q_table)
+                if not self._busy and self._snapshot is None and self._dirty is None:
+                    break
+                self._cond.wait()
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            with self._cond:
+                self._closed = True
+                self._cond.notify_all()
+            self._thread.join()
+            atexit.unregister(self.close)
+
+
+def csv_to_checkpoint(csv_path, path, gridNum=12, gridWidth=80, n_actions=4):
+    """Convert a legacy Qtable.csv into a binary checkpoint."""
+    save(path, QTable.load_csv(csv_path, gridNum, gridWidth, n_actions), gridNum, gridWidth)
+
+
+def checkpoint_to_csv(path, csv_path):
+    """Export a binary checkpoint in the legacy Qtable.csv layout."""
+    q_table, header = load(path)
+    QTable.save_csv(q_table, csv_path, header['gridNum'], header['gridWidth'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert between Qtable.csv and binary Q-table checkpoints')
+    sub = parser.add_subparsers(dest='command', required=True)
+    to_csv = sub.add_parser('to-csv')
+    to_csv.add_argument('checkpoint')
+    to_csv.add_argument('csv')
+    from_csv = sub.add_parser('from-csv')
+    from_csv.add_argument('csv')
+    from_csv.add_argument('checkpoint')
+    from_csv.add_argument('--grid-num', type=int, default=12)
+    from_csv.add_argument('--grid-width', type=int, default=80)
+    from_csv.add_argument('--actions', type=int, default=4)
+    info = sub.add_parser('info')
+    info.add_argument('checkpoint')
+    args = parser.parse_args()
+    if args.command == 'to-csv':
+        checkpoint_to_csv(args.checkpoint, args.csv)
+    elif args.command == 'from-csv':
+        csv_to_checkpoint(args.csv, args.checkpoint, args.grid_num, args.grid_width, args.actions)
+    else:
+        header = read_header(args.checkpoint)
+        for key, value in header.items():
+            print('%s: %s' % (key, value.hex() if isinstance(value, bytes) else value))
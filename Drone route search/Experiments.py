@@ -0,0 +1,93 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from World import GridWorld
+from Agent import Agent
+import main
+
+# Config fields of one run, in the order they appear in the grid
+CONFIG_FIELDS = ('seed', 'num_buildings', 'gridNum', 'learning_rate', 'reward_decay', 'epsilon')
+
+
+def config_grid(seeds, num_buildings, grid_nums, learning_rates, reward_decays, epsilons):
+    """Cartesian product of the sweep axes as a list of config dicts."""
+    return [dict(zip(CONFIG_FIELDS, values))
+            for values in itertools.product(seeds, num_buildings, grid_nums, learning_rates, reward_decays, epsilons)]
+
+
+def run_key(config):
+    """Stable identifier of a config, used to skip finished runs on resume."""
+    return json.dumps([config[field] for field in CONFIG_FIELDS])
+
+
+def run_one(config, episodes=200, max_steps=None):
+    """Train one headless GridWorld + Agent for a config and return its result record."""
+    seed = config['seed']
+    random.seed(seed)
+    np.random.seed(seed)
+    gridNum = config['gridNum']
+    # Keep the usual (9, 9) goal, pulled inside smaller grids
+    goal = min(9, gridNum - 1)
+    env = GridWorld(gridNum=gridNum, num_buildings=config['num_buildings'], goal_pos=(goal, goal), bird_seed=seed)
+    agent = Agent(actions=range(env.actions_num), learning_rate=config['learning_rate'], reward_decay=config['reward_decay'],
+                  epsilon=config['epsilon'], weather=env.weather, cell_weather=env.cell_weather, env=env, verbose=False)
+    t0 = time.perf_counter()
+    metrics = main.start(env, agent, TOTAL_EXPLORE_EPOCH=episodes, qtable_path=None, max_steps=max_steps, verbose=False,
+                         csv_path=None)
+    metrics['wall_time'] = time.perf_counter() - t0
+    return dict(config, key=run_key(config), **metrics)
+
+
+def completed_keys(path):
+    """Keys of runs already recorded in a results file; a torn last line from an interrupted write is ignored."""
+    keys = set()
+    if not os.path.exists(path):
+        return keys
+    with open(path) as f:
+        for line in f:
+            try:
+                keys.add(json.loads(line)['key'])
+            except (ValueError, KeyError):
+                continue
+    return keys
+
+
+def run_sweep(configs, results_path, episodes=200, max_steps=None, workers=None):
+    """Run every config not yet in results_path across a process pool, appending one JSON line per finished run."""
+    done = completed_keys(results_path)
+    pending = [c for c in configs if run_key(c) not in done]
+    print('%d runs, %d already done, %d to go' % (len(configs), len(configs) - len(pending), len(pending)))
+    if not pending:
+        return
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool, open(results_path, 'a') as out:
+        futures = [pool.submit(run_one, c, episodes, max_steps) for c in pending]
+        for finished, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+            print('[%d/%d] %s success %.2f%% R %.3f' % (finished, len(pending), result['key'],
+                                                        result['success_rate'] * 100, result['avg_reward']))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Headless Q-learning sweep over seeds x layouts x hyperparameters')
+    parser.add_argument('--results', default=os.path.join(main.SCRIPT_DIR, 'experiments.jsonl'))
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0, 1, 2, 3])
+    parser.add_argument('--num-buildings', type=int, nargs='+', default=[22])
+    parser.add_argument('--grid-num', type=int, nargs='+', default=[12])
+    parser.add_argument('--lr', type=float, nargs='+', default=[0.01, 0.1])
+    parser.add_argument('--gamma', type=float, nargs='+', default=[0.9])
+    parser.add_argument('--epsilon', type=float, nargs='+', default=[0.01, 0.1])
+    parser.add_argument('--episodes', type=int, default=200)
+    parser.add_argument('--max-steps', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    configs = config_grid(args.seeds, args.num_buildings, args.grid_num, args.lr, args.gamma, args.epsilon)
+    run_sweep(configs, args.results, episodes=args.episodes, max_steps=args.max_steps, workers=args.workers)
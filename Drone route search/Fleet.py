@@ -0,0 +1,210 @@
+import numpy as np
+from World import GridWorld, STEP_REWARD, BUILDING_REWARD, GOAL_REWARD, BIRD_REWARD, \
+    BIRD_ADJACENT_REWARD, WEATHER_PENALTY
+
+# Penalty for two drones ending a step in the same cell or swapping cells
+CONFLICT_REWARD = -20
+
+
+class FleetWorld:
+    # M drones with their own start/goal cells moving simultaneously on one GridWorld's layout (buildings,
+    # weather and birds). Positions are an int array of flat cells (col * gridNum + row); a drone that reaches its
+    # goal leaves the grid. Drones that would end in the same cell or swap cells stay where they were and get
+    # conflict_reward instead of their move; conflicts are detected with array ops in O(M) per step.
+    def __init__(self, world, starts, goals, conflict_reward=CONFLICT_REWARD):
+        self.world = world
+        self.gridNum = G = world.gridNum
+        self.starts = np.array([col * G + row for col, row in starts], dtype=np.int64)
+        self.goals = np.array([col * G + row for col, row in goals], dtype=np.int64)
+        if len(self.starts) != len(self.goals):
+            raise ValueError('Need one goal per start')
+        if world.building_mask.ravel()[np.concatenate([self.starts, self.goals])].any():
+            raise ValueError('Starts and goals must not be buildings')
+        self.m = len(self.starts)
+        self.actions_num = world.actions_num
+        self.conflict_reward = conflict_reward
+        # Goal-independent moves: the world's transition table (staying put at edges and buildings) without its
+        # own goal's shortcut to 'finished'
+        self.blocked = world.blocked_moves[:-1]
+        self.moves = world.transitions[:-1].astype(np.int64)
+        self.moves[self.moves == world.finished_index] = world.cell_index(world.goal_pos)
+        self._weather_penalty = WEATHER_PENALTY[world.weather_codes.ravel()]
+        # Scratch per-cell arrays, cleared after every use so each step stays O(M)
+        self._count = np.zeros(G * G, dtype=np.int32)
+        self._dest = np.full(G * G, -1, dtype=np.int64)
+        self._ids = np.arange(self.m)
+        self.reset()
+
+    def reset(self):
+        self.positions = self.starts.copy()
+        self.done = np.zeros(self.m, dtype=bool)
+        return self.positions
+
+    def _shared_cells(self, cells):
+        # Boolean mask of entries of cells that appear more than once
+        count = self._count
+        np.add.at(count, cells, 1)
+        shared = count[cells] > 1
+        count[cells] = 0
+        return shared
+
+    def _send_back(self, idx, back, cur, nxt, conflict):
+        # Drones in back have just returned to their source cells. Each returned drone checks the one cell it
+        # returns to: a drone that moved into it conflicts and is sent back in turn. A drone is sent back at most
+        # once, so the whole resolution is O(M). nxt and conflict are updated in place.
+        owner = self._dest
+        returned = np.zeros(self.m, dtype=bool)
+        returned[back] = True
+        keep = idx[~returned[idx]]
+        owner[nxt[keep]] = keep
+        cur_list = cur.tolist()
+        work = back.tolist()
+        while work:
+            d = work.pop()
+            cell = cur_list[d]
+            e = int(owner[cell])
+            if e >= 0 and e != d:
+                conflict[d] = conflict[e] = True
+                if cur_list[e] != cell:
+                    nxt[e] = cur_list[e]
+                    work.append(e)
+            owner[cell] = d
+        owner[nxt[idx]] = -1
+
+    def step(self, actions):
+        """Move every active drone; returns (positions, reward, shaped_reward, finished, conflict) arrays.
+
+        finished marks drones reaching their goal this step; done accumulates finished drones and bird hits.
+        shaped_reward adds Agent.update_q_table's weather and bird-adjacency terms.
+        """
+        world = self.world
+        world.birds.tick()
+        active = ~self.done
+        cur = self.positions
+        nxt = np.where(active, self.moves[cur, actions], cur)
+        blocked = active & self.blocked[cur, actions]
+
+        # Edge conflicts: two drones crossing the same edge (a swap); vertex conflicts: two active drones ending in
+        # the same cell. Conflicting movers stay where they were, which can put them in the way of a drone that
+        # moved into their cell; _send_back follows those chains one returned drone at a time.
+        idx = self._ids[active]
+        conflict = np.zeros(self.m, dtype=bool)
+        if len(idx) > 1:
+            movers = idx[cur[idx] != nxt[idx]]
+            if len(movers) > 1:
+                # Record each mover's destination at its source cell; a swap reads its own source back
+                a, b = cur[movers], nxt[movers]
+                dest = self._dest
+                dest[a] = b
+                conflict[movers] |= dest[b] == a
+                dest[a] = -1
+            conflict[idx] |= self._shared_cells(nxt[idx])
+            back = idx[conflict[idx] & (cur[idx] != nxt[idx])]
+            if len(back):
+                nxt[back] = cur[back]
+                self._send_back(idx, back, cur, nxt, conflict)
+
+        finished = active & ~conflict & (nxt == self.goals)
+        hit = active & ~conflict & ~blocked & ~finished & (world.birds.occupied_array[nxt] > 0)
+        reward = np.where(blocked, BUILDING_REWARD, STEP_REWARD)
+        reward = np.where(finished, GOAL_REWARD, reward)
+        reward = np.where(hit, BIRD_REWARD, reward)
+        reward = np.where(conflict, self.conflict_reward, reward)
+        reward = np.where(active, reward, 0)
+
+        adjacent = world.birds.adjacent_array[nxt] > 0
+        shaped = reward + np.where(active & ~finished,
+                                   self._weather_penalty[nxt] + np.where(adjacent, BIRD_ADJACENT_REWARD, 0), 0)
+        self.positions = nxt
+        self.done = self.done | finished | hit
+        return nxt, reward, shaped, finished, conflict & active
+
+    def cells(self):
+        """Current positions as an (M, 2) array of [col, row]."""
+        return np.stack(np.divmod(self.positions, self.gridNum), axis=1)
+
+
+class FleetTrainer:
+    # Tabular Q-learning for a FleetWorld, all drones updated together with array ops.
+    # shared=False gives every drone its own Q-table; shared=True gives one table per distinct goal, shared by
+    # the drones heading there (a table keyed on the cell alone cannot serve two goals). Each table has one row per
+    # cell plus a zero 'finished' row, like Agent.q_table.
+    def __init__(self, fleet, shared=False, learning_rate=0.1, reward_decay=0.9, epsilon=0.05, seed=None,
+                 dtype=np.float64):
+        self.fleet = fleet
+        self.lr = learning_rate
+        self.gamma = reward_decay
+        self.epsilon = epsilon
+        self.rng = np.random.default_rng(seed)
+        G = fleet.gridNum
+        self.finished_index = G * G
+        rows = G * G + 1
+        if shared:
+            _, self.table_of = np.unique(fleet.goals, return_inverse=True)
+        else:
+            self.table_of = np.arange(fleet.m)
+        n_tables = int(self.table_of.max()) + 1
+        self.q_tables = np.zeros((n_tables, rows, fleet.actions_num), dtype=dtype)
+        self._q = self.q_tables.reshape(-1, fleet.actions_num)
+        self._row_base = self.table_of * rows
+
+    def select_actions(self, positions):
+        q = self._q[self._row_base + positions]
+        # Greedy with random tie-breaking, then epsilon exploration per drone
+        keys = self.rng.random(q.shape) * (q == q.max(axis=1, keepdims=True))
+        actions = keys.argmax(axis=1)
+        explore = self.rng.random(len(actions)) < self.epsilon
+        actions[explore] = self.rng.integers(0, self.fleet.actions_num, explore.sum())
+        return actions
+
+    def update(self, state, actions, shaped, nxt, finished, active):
+        # Drones that reach their goal bootstrap from the zero 'finished' row. With a shared table two drones may
+        # update the same entry in one step; the last write wins, as if the updates ran one after another.
+        q = self._q
+        rows = self._row_base + state
+        next_rows = self._row_base + np.where(finished, self.finished_index, nxt)
+        target = shaped + self.gamma * q[next_rows].max(axis=1)
+        a = rows[active], actions[active]
+        q[a] += self.lr * (target[active] - q[a])
+
+    def train(self, episodes=200, max_steps=500):
+        """Train for the given number of episodes; returns per-episode arrays of fleet metrics."""
+        fleet = self.fleet
+        success = np.zeros(episodes)
+        conflicts = np.zeros(episodes, dtype=np.int64)
+        rewards = np.zeros(episodes)
+        steps = np.zeros(episodes, dtype=np.int64)
+        for episode in range(episodes):
+            fleet.reset()
+            reached = np.zeros(fleet.m, dtype=bool)
+            for _ in range(max_steps):
+                active = ~fleet.done
+                if not active.any():
+                    break
+                state = fleet.positions
+                actions = self.select_actions(state)
+                nxt, reward, shaped, finished, conflict = fleet.step(actions)
+                steps[episode] += 1
+                self.update(state, actions, shaped, nxt, finished, active)
+                reached |= finished
+                conflicts[episode] += conflict.sum()
+                rewards[episode] += reward.sum()
+            success[episode] = reached.mean()
+        return {'success_rate': success, 'conflicts': conflicts, 'reward': rewards, 'steps': steps}
+
+
+if __name__ == "__main__":
+    import random
+    import time
+    random.seed(0)
+    world = GridWorld(gridNum=12, num_buildings=12, bird_seed=0)
+    free = [divmod(i, 12) for i in np.flatnonzero(~world.building_mask.ravel())]
+    cells = random.sample(free, 16)
+    for shared in (False, True):
+        fleet = FleetWorld(world, cells[:8], cells[8:] if not shared else [cells[8]] * 4 + [cells[9]] * 4)
+        trainer = FleetTrainer(fleet, shared=shared, seed=0)
+        t0 = time.perf_counter()
+        metrics = trainer.train(episodes=300)
+        print('%s tables: %.2fs, last 50 episodes: success %.2f%%, conflicts %.1f, steps %.1f' % (
+            'shared' if shared else 'independent', time.perf_counter() - t0, metrics['success_rate'][-50:].mean() * 100,
+            metrics['conflicts'][-50:].mean(), metrics['steps'][-50:].mean()))
@@ -0,0 +1,73 @@
+import array
+import copy
+import numpy as np
+
+
+# Same (dcol, drow) order as World.ACTION_DELTAS; kept local so World can import this module
+_DELTAS = np.array([[0, -1], [0, 1], [-1, 0], [1, 0]])
+_ONE = np.uint32(1)
+
+
+class BirdScheduler:
+    # Moving hazards driven by the simulation clock: tick() is called once per environment step and every
+    # move_every ticks all birds move one cell in a random direction at once, reversing a move that would leave
+    # the grid. Runs are reproducible for a given seed, independent of how fast the loop runs.
+    # positions is one (n, 2) int array of [col, row] updated in place, so renderers can share it.
+    # occupied[s] / adjacent[s] count the birds on / next to (Manhattan distance 1) flat state s = col * gridNum + row;
+    # both have an extra always-zero slot for 'finished'. They are uint32 array.arrays, fast to index from Python;
+    # occupied_array / adjacent_array are numpy views of the same memory for array access.
+    def __init__(self, gridNum, positions, move_every=50, seed=None):
+        self.gridNum = gridNum
+        # Starting positions outside a small grid are pulled onto its edge
+        self.positions = np.clip(np.array(positions, dtype=np.int64).reshape(-1, 2), 0, gridNum - 1)
+        self.move_every = move_every
+        self.rng = np.random.default_rng(seed)
+        self.steps = 0
+        self.occupied = array.array('I', bytes(4 * (gridNum * gridNum + 1)))
+        self.adjacent = array.array('I', bytes(4 * (gridNum * gridNum + 1)))
+        self.occupied_array = np.frombuffer(self.occupied, dtype=np.uint32)
+        self.adjacent_array = np.frombuffer(self.adjacent, dtype=np.uint32)
+        self._mark(np.add)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _mark(self, op):
+        # Add (np.add) or remove (np.subtract) the current positions in the occupancy and adjacency counts. The
+        # increment has the counts' dtype, which keeps ufunc.at on its fast path
+        G = self.gridNum
+        col, row = self.positions[:, 0], self.positions[:, 1]
+        cell = col * G + row
+        op.at(self.occupied_array, cell, _ONE)
+        op.at(self.adjacent_array, np.concatenate((cell[row > 0] - 1, cell[row < G - 1] + 1,
+                                                   cell[col > 0] - G, cell[col < G - 1] + G)), _ONE)
+
+    def tick(self):
+        """Advance the clock by one step; returns True if the birds moved."""
+        self.steps += 1
+        if self.move_every and self.steps % self.move_every == 0:
+            self.move()
+            return True
+        return False
+
+    def move(self):
+        delta = _DELTAS[self.rng.integers(0, len(_DELTAS), len(self.positions))]
+        moved = self.positions + delta
+        outside = ((moved < 0) | (moved >= self.gridNum)).any(axis=1)
+        moved[outside] = self.positions[outside] - delta[outside]
+        self._mark(np.subtract)
+        self.positions[:] = moved
+        self._mark(np.add)
+
+    def set_positions(self, positions):
+        """Place the birds explicitly, e.g. to replay a recorded scenario."""
+        self._mark(np.subtract)
+        self.positions[:] = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        self._mark(np.add)
+
+    def clone(self):
+        """Independent scheduler in the same state: positions, clock and random generator."""
+        other = BirdScheduler(self.gridNum, self.positions, self.move_every)
+        other.steps = self.steps
+        other.rng = copy.deepcopy(self.rng)
+        return other
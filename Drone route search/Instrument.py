@@ -0,0 +1,172 @@
+import cProfile
+import json
+import sys
+import time
+
+import numpy as np
+import QTable
+
+
+class Instrumentation:
+    # Opt-in timers and counters for a training run. attach() wraps the hot methods of one environment, agent
+    # and checkpointer as instance attributes, so nothing changes (and nothing costs) until it is attached, and
+    # detach() restores the originals.
+    # Every every_episodes episodes one JSON line is written to stream (a path or file object): per-phase
+    # call counts and time, steps/sec and episodes/sec over the interval, Q-table memory and visited rows, and
+    # the mean/max absolute TD error of the interval's updates.
+    # profile_episodes=(first, last) runs cProfile over that (0-based, inclusive) episode range and dumps it to
+    # profile_path.
+    PHASES = ('env.step', 'env.render', 'agent.action_select', 'agent.update_q_table', 'checkpoint.request')
+
+    def __init__(self, stream=sys.stderr, every_episodes=10, profile_episodes=None, profile_path='profile.out'):
+        self._owns_stream = isinstance(stream, str)
+        self.stream = open(stream, 'a') if self._owns_stream else stream
+        self.every_episodes = every_episodes
+        self.profile_episodes = profile_episodes
+        self.profile_path = profile_path
+        self.profiler = None
+        self.episodes = 0
+        self._wrapped = []
+        self.calls = dict.fromkeys(self.PHASES, 0)
+        self.time_ns = dict.fromkeys(self.PHASES, 0)
+        self._clear()
+        self._start = self._interval_start
+
+    def _clear(self):
+        # The wrappers hold references to calls/time_ns, so they are cleared in place, never rebound
+        for name in self.PHASES:
+            self.calls[name] = 0
+            self.time_ns[name] = 0
+        self.td_abs_sum = 0.0
+        self.td_abs_max = 0.0
+        self.td_count = 0
+        self._interval_start = time.perf_counter()
+        self._interval_episodes = 0
+
+    def _timed(self, name, method):
+        calls, time_ns, clock = self.calls, self.time_ns, time.perf_counter_ns
+
+        def wrapper(*args, **kwargs):
+            t0 = clock()
+            result = method(*args, **kwargs)
+            time_ns[name] += clock() - t0
+            calls[name] += 1
+            return result
+        return wrapper
+
+    def _wrap(self, obj, attr, wrapper):
+        # Instance attribute shadows the class method; detach() deletes it again
+        self._wrapped.append((obj, attr, obj.__dict__.get(attr)))
+        setattr(obj, attr, wrapper)
+
+    def attach(self, env, agent, checkpointer=None):
+        self._wrap(env, 'step', self._timed('env.step', env.step))
+        self._wrap(env, 'render', self._timed('env.render', env.render))
+        self._wrap(env, 'reset', self._on_reset(env.reset))
+        self._wrap(agent, 'action_select', self._timed('agent.action_select', agent.action_select))
+        self._wrap(agent, 'update_q_table', self._tracked_update(agent))
+        if checkpointer is not None:
+            self._wrap(checkpointer, 'request', self._timed('checkpoint.request', checkpointer.request))
+        self.agent = agent
+        if self.profile_episodes is not None and self.profile_episodes[0] == 0:
+            self._start_profiler()
+        return self
+
+    def _tracked_update(self, agent):
+        # The TD error is recovered from the change of Q(s, a): delta = (after - before) / lr
+        timed = self._timed('agent.update_q_table', agent.update_q_table)
+
+        def wrapper(s, a, r, sig):
+            state = agent.state_index(s)
+            before = agent.q_table[state, a]
+            timed(s, a, r, sig)
+            if agent.lr:
+                delta = abs(float(agent.q_table[state, a] - before)) / agent.lr
+                self.td_abs_sum += delta
+                self.td_count += 1
+                if delta > self.td_abs_max:
+                    self.td_abs_max = delta
+        return wrapper
+
+    def _on_reset(self, reset):
+        # env.reset() starts every episode in main.start(), so it doubles as the episode clock
+        def wrapper(*args, **kwargs):
+            if self.calls['env.step']:
+                self._episode_done()
+            return reset(*args, **kwargs)
+        return wrapper
+
+    def _episode_done(self):
+        self.episodes += 1
+        self._interval_episodes += 1
+        if self.profile_episodes is not None:
+            first, last = self.profile_episodes
+            if self.episodes == first:
+                self._start_profiler()
+            elif self.episodes == last + 1 and self.profiler is not None:
+                self._stop_profiler()
+        if self.every_episodes and self.episodes % self.every_episodes == 0:
+            self.emit()
+
+    def _start_profiler(self):
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def _stop_profiler(self):
+        self.profiler.disable()
+        self.profiler.dump_stats(self.profile_path)
+        self.profiler = None
+
+    def q_table_stats(self):
+        q_table = self.agent.q_table
+        if isinstance(q_table, QTable.TiledQTable):
+            return {'q_table_bytes': q_table.nbytes, 'q_table_tiles': len(q_table.tiles)}
+        q_table = np.asarray(q_table)
+        return {'q_table_bytes': int(q_table.nbytes), 'q_rows_visited': int(np.count_nonzero(q_table.any(axis=1)))}
+
+    def snapshot(self):
+        """Metrics of the current interval as a JSON-ready dict."""
+        elapsed = time.perf_counter() - self._interval_start
+        steps = self.calls['env.step']
+        record = {
+            'episode': self.episodes,
+            'elapsed_s': time.perf_counter() - self._start,
+            'interval_s': elapsed,
+            'steps': steps,
+            'steps_per_sec': steps / elapsed if elapsed else 0.0,
+            'episodes_per_sec': self._interval_episodes / elapsed if elapsed else 0.0,
+            'phases': {name: {'calls': self.calls[name], 'total_s': self.time_ns[name] / 1e9,
+                              'mean_us': self.time_ns[name] / self.calls[name] / 1e3 if self.calls[name] else 0.0}
+                       for name in self.PHASES if self.calls[name]},
+            'td_error_mean_abs': self.td_abs_sum / self.td_count if self.td_count else 0.0,
+            'td_error_max_abs': self.td_abs_max,
+        }
+        record.update(self.q_table_stats())
+        return record
+
+    def emit(self):
+        """Write the current interval as one JSON line and start a new interval."""
+        self.stream.write(json.dumps(self.snapshot()) + '\n')
+        self.stream.flush()
+        self._clear()
+
+    def detach(self):
+        for obj, attr, original in reversed(self._wrapped):
+            if original is None:
+                delattr(obj, attr)
+            else:
+                setattr(obj, attr, original)
+        self._wrapped = []
+
+    def close(self):
+        """Count the last episode, write the final partial interval, stop profiling and restore the methods."""
+        if self.calls['env.step']:
+            self.episodes += 1
+            self._interval_episodes += 1
+        if self._interval_episodes:
+            self.emit()
+        if self.profiler is not None:
+            self._stop_profiler()
+        self.detach()
+        if self._owns_stream:
+            self.stream.close()
@@ -1,58 +1,69 @@
 import numpy as np
 import tkinter as tk
 import random
+import time
+from World import GridWorld
 
 class InitLayout(tk.Tk):
+    # Tk window that renders a headless World.GridWorld; reset/step delegate to the world
     # gridNum: number of grid cells, gridWidth: width of each cell, objWidth: width of objects inside a cell
-    def __init__(self, gridNum=12, gridWidth=80, objWidth=50, num_buildings=22, start_pos=(0,0), goal_pos=(9,9), weather='normal', cell_weather=None):
+    # render_every/max_fps throttle redraws: render() draws a frame at most every render_every calls and at most
+    # max_fps times per second, skipping the others; step_delay is the pause main.start() adds per step after
+    # the fast-learning epochs. decorations=False skips the snowflakes and raindrops.
+    def __init__(self, gridNum=12, gridWidth=80, objWidth=50, num_buildings=22, start_pos=(0,0), goal_pos=(9,9), weather='normal', cell_weather=None, world=None,
+                 render_every=1, max_fps=None, step_delay=0.1, decorations=True):
         super(InitLayout, self).__init__()
-        self.weather = weather
-        # Generate weather distribution if not provided
-        if cell_weather is None:
-            cell_weather = {}
-            # Left half: sunny
-            for col in range(gridNum // 2):
-                for row in range(gridNum):
-                    cell_weather[(col, row)] = 'sunny'
-            # Right half: cloudy (default)
-            for col in range(gridNum // 2, gridNum):
-                for row in range(gridNum):
-                    cell_weather[(col, row)] = 'cloudy'
-            # Top-right quadrant: snow
-            for col in range(gridNum // 2, gridNum):
-                for row in range(0, gridNum // 2):
-                    cell_weather[(col, row)] = 'snow'
-            # Bottom-left quadrant: rain
-            for col in range(0, gridNum // 2):
-                for row in range(gridNum // 2, gridNum):
-                    cell_weather[(col, row)] = 'rain'
-        self.cell_weather = cell_weather
+        if world is None:
+            world = GridWorld(gridNum=gridNum, gridWidth=gridWidth, objWidth=objWidth, num_buildings=num_buildings,
+                              start_pos=start_pos, goal_pos=goal_pos, weather=weather, cell_weather=cell_weather)
+        self.render_every = max(1, render_every)
+        self.max_fps = max_fps
+        self.step_delay = step_delay
+        self.decorations = decorations
+        self._render_calls = 0
+        self._last_frame = 0.0
+        self.frames = 0
+        self.drawing = None
+        self.world = None
+        self.attach(world)
+
+    def attach(self, world):
+        """Render world from now on; safe to call between steps of a training loop that is already running."""
+        if self.world is not None and self.world is not world:
+            self.detach()
+        self.world = world
+        world.renderer = self
+        self.weather = world.weather
+        self.cell_weather = world.cell_weather
         if self.weather == 'sunny':
             self.title('Drone route planning - Sunny')
         else:
             self.title('Drone route planning')
-        self.gridNum = gridNum
-        self.gridWidth = gridWidth
-        self.objWidth = objWidth
+        self.gridNum = world.gridNum
+        self.gridWidth = world.gridWidth
+        self.objWidth = world.objWidth
         self.borderSize = self.gridNum * self.gridWidth
-        # 4 actions
-        self.action_space = ['up', 'down', 'left', 'right']
-        self.actions_num = len(self.action_space)
-        # Black hole positions, indices in row/column grid (static hazards)
-        self.blacks = [[0, 2], [1, 2], [3, 0], [4, 4]]  # static hazards
-        # Black hole canvas coordinate list
+        self.action_space = world.action_space
+        self.actions_num = world.actions_num
+        # Bird grid positions are shared with the world, which moves them
+        self.blacks = world.blacks
+        # Bird canvas coordinate list
         self.blackCoors = []
-        # Store start and goal positions
-        self.start_pos = start_pos
-        self.goal_pos = goal_pos
-        # Generate buildings randomly, avoiding start, goal, and black hole positions
-        all_cells = [(col, row) for col in range(gridNum) for row in range(gridNum)]
-        forbidden_cells = set([start_pos, goal_pos] + [tuple(b) for b in self.blacks])
-        available_cells = [cell for cell in all_cells if cell not in forbidden_cells]
-        self.buildings = random.sample(available_cells, min(num_buildings, len(available_cells)))
+        self.start_pos = world.start_pos
+        self.goal_pos = world.goal_pos
+        self.buildings = world.buildings
         # Canvas coordinate list for buildings
         self.buildingCoors = []
+        if self.drawing is not None:
+            self.drawing.destroy()
+        self.black_ids = []
+        self.building_ids = []
         self.start_drawing()
+
+    def detach(self):
+        """Stop rendering the world without closing the window; the world carries on headless."""
+        if self.world is not None and self.world.renderer is self:
+            self.world.renderer = None
   
  
     def start_drawing(self):
@@ -76,6 +87,8 @@ class InitLayout(tk.Tk):
                 y1 = y0 + self.gridWidth
                 self.drawing.create_rectangle(x0, y0, x1, y1, fill=color, outline='')
                 # If snowy, draw a few small snowflakes (simple circles)
+                if not self.decorations:
+                    continue
                 if cell_type == 'snow':
                     for _ in range(3):
                         fx = random.uniform(x0 + 5, x1 - 5)
@@ -119,12 +132,8 @@ class InitLayout(tk.Tk):
             ]
             bird_id = self.drawing.create_polygon(points, fill='#6b4423', outline='black', width=2)
             self.blackCoors.append(self.drawing.coords(bird_id))
-            if not hasattr(self, 'black_ids'):
-                self.black_ids = []
             self.black_ids.append(bird_id)
         # Draw static buildings (obstacles)
-        if not hasattr(self, 'building_ids'):
-            self.building_ids = []
         for bidx, bpos in enumerate(self.buildings):
             bcol, brow = bpos
             bcenter = start_pos + np.array([self.gridWidth * bcol, self.gridWidth * brow])
@@ -147,110 +156,58 @@ class InitLayout(tk.Tk):
             fill='blue')
 
         # Draw the agent
-        self.rect = self.drawing.create_oval(
-            start_pos[0] - self.objWidth / 2, start_pos[1] - self.objWidth / 2,
-            start_pos[0] + self.objWidth / 2, start_pos[1] + self.objWidth / 2,
-            fill='green')
+        self.rect = self.drawing.create_oval(*self._cell_box(self.world.agent_pos), fill='green')
 
         self.drawing.pack()
-        # Black holes now move randomly every 500ms
-        self.move_blacks()
- 
-    def reset(self):
-        # Redraw agent position
-        self.drawing.delete(self.rect)
-        origin = np.array([self.gridWidth / 2, self.gridWidth / 2])
-        self.rect = self.drawing.create_oval(
-            origin[0] - self.objWidth / 2, origin[1] - self.objWidth / 2,
-            origin[0] + self.objWidth / 2, origin[1] + self.objWidth / 2,
-            fill='green')
+        # Agent and bird grid positions as last drawn, so sync only moves the items that changed
+        self._drawn_agent = tuple(self.world.agent_pos)
+        self._drawn_blacks = [tuple(b) for b in self.blacks]
 
-        return self.drawing.coords(self.rect)
+    def _cell_box(self, cell):
+        """Canvas bounding box of an object drawn in the given (col, row) cell."""
+        cx = (cell[0] + 0.5) * self.gridWidth
+        cy = (cell[1] + 0.5) * self.gridWidth
+        half = self.objWidth / 2
+        return cx - half, cy - half, cx + half, cy + half
 
-    # 智能体移动
-    def step(self, action):
-        s = self.drawing.coords(self.rect)
-        # Determine agent current grid index from canvas coords
-        center_x = (s[0] + s[2]) / 2.0
-        center_y = (s[1] + s[3]) / 2.0
-        cur_col = int(center_x // self.gridWidth)
-        cur_row = int(center_y // self.gridWidth)
+    def reset(self):
+        return self.world.reset()
 
-        # Determine target grid index based on action
-        tgt_col, tgt_row = cur_col, cur_row
-        if action == 0:  # up
-            tgt_row = max(0, cur_row - 1)
-        elif action == 1:  # down
-            tgt_row = min(self.gridNum - 1, cur_row + 1)
-        elif action == 2:  # left
-            tgt_col = max(0, cur_col - 1)
-        elif action == 3:  # right
-            tgt_col = min(self.gridNum - 1, cur_col + 1)
+    # Agent moves in the headless world; the canvas is synced on render()
+    def step(self, action):
+        return self.world.step(action)
 
-        # If target cell is a static building, block movement
-        if (tgt_col, tgt_row) in self.buildings:
-            # No movement into buildings; small penalty
-            sig = self.drawing.coords(self.rect)
-            reward = -5
-            finished = False
-            return sig, reward, finished
+    def sync(self):
+        """Move the agent and bird canvas items to the world's current positions."""
+        agent = tuple(self.world.agent_pos)
+        if agent != self._drawn_agent:
+            self.drawing.coords(self.rect, *self._cell_box(agent))
+            self._drawn_agent = agent
+        for idx, black_id in enumerate(self.black_ids):
+            col, row = self.blacks[idx]
+            old_col, old_row = self._drawn_blacks[idx]
+            if (col, row) != (old_col, old_row):
+                self.drawing.move(black_id, (col - old_col) * self.gridWidth, (row - old_row) * self.gridWidth)
+                self._drawn_blacks[idx] = (col, row)
+                self.blackCoors[idx] = self.drawing.coords(black_id)
 
-        # Compute pixel offset and move the agent
-        dx = (tgt_col - cur_col) * self.gridWidth
-        dy = (tgt_row - cur_row) * self.gridWidth
-        self.drawing.move(self.rect, dx, dy)
-        sig = self.drawing.coords(self.rect)
- 
-        # Default reward and done flag
-        reward = -1
-        finished = False
-        # Reached destination
-        if sig == self.drawing.coords(self.dist):
-            reward = 100
-            finished = True
-            sig = 'finished'
-        # Fell into a black hole
-        elif sig in self.blackCoors:
-            reward = -100
-            finished = True
-        # Check collision with black holes
-        for black_coords in self.blackCoors:
-            if sig == black_coords:
-                reward = -100
-                finished = True
-                return sig, reward, finished
- 
-        return sig, reward, finished
- 
-    def render(self):
+    def render(self, force=False):
+        """Draw a frame unless throttled by render_every/max_fps; force=True always draws."""
+        self._render_calls += 1
+        if not force:
+            if self._render_calls % self.render_every:
+                return
+            if self.max_fps and time.monotonic() - self._last_frame < 1.0 / self.max_fps:
+                return
+        self.sync()
         self.update()
+        self._last_frame = time.monotonic()
+        self.frames += 1
 
     def move_blacks(self):
-        # Each black hole moves randomly one cell in a direction (up/down/left/right); reverse if out of bounds
-        import random
-        for idx, black_id in enumerate(self.black_ids):
-            dx, dy = 0, 0
-            direction = random.choice(['up', 'down', 'left', 'right'])
-            if direction == 'up':
-                dy = -self.gridWidth
-            elif direction == 'down':
-                dy = self.gridWidth
-            elif direction == 'left':
-                dx = -self.gridWidth
-            elif direction == 'right':
-                dx = self.gridWidth
-
-            # Get current coordinates
-            coords = self.drawing.coords(black_id)
-            # Check bounds, reverse direction if out of bounds
-            new_x0, new_y0, new_x1, new_y1 = coords[0]+dx, coords[1]+dy, coords[2]+dx, coords[3]+dy
-            if new_x0 < 0 or new_y0 < 0 or new_x1 > self.borderSize or new_y1 > self.borderSize:
-                dx, dy = -dx, -dy
-
-            # Move the lightning (black hole)
-            self.drawing.move(black_id, dx, dy)
-            # Update blackCoors
-            self.blackCoors[idx] = self.drawing.coords(black_id)
+        self.world.move_blacks()
 
-        # Move every 500ms
-        self.after(500, self.move_blacks)
+    def destroy(self):
+        # Detach so the headless world keeps running after the window closes
+        self.detach()
+        super(InitLayout, self).destroy()
@@ -0,0 +1,268 @@
+import heapq
+import numpy as np
+import QTable
+from World import GridWorld, ACTION_DELTAS, STEP_REWARD, WEATHER_PENALTY, BIRD_REWARD, BIRD_ADJACENT_REWARD
+
+
+# Model-based solvers for the static reward model (buildings, weather, start and goal; birds are ignored
+# except by the incremental DStarLite planner). Functions accept a GridWorld or anything wrapping one as .world (e.g. Layout.InitLayout).
+
+
+def _world(env):
+    return getattr(env, 'world', env)
+
+
+def value_iteration(env, reward_decay=0.9, tol=1e-6, max_iter=10000):
+    """Exact Q-table of the static model, shaped like Agent.q_table (one row per cell plus 'finished').
+
+    Uses the same targets as Agent.update_q_table: shaped reward plus the discounted best next value,
+    with 'finished' worth 0.
+    """
+    world = _world(env)
+    transitions = world.transitions
+    rewards = world.shaped_rewards.astype(np.float64)
+    q_table = np.zeros(rewards.shape)
+    for _ in range(max_iter):
+        values = q_table.max(axis=1)
+        values[world.finished_index] = 0.0
+        new_q = rewards + reward_decay * values[transitions]
+        new_q[world.finished_index] = 0.0
+        delta = np.abs(new_q - q_table).max()
+        q_table = new_q
+        if delta < tol:
+            break
+    return q_table
+
+
+def cell_costs(env):
+    """Cost of entering each cell as a (gridNum, gridNum) array: the step cost plus snow/rain penalties."""
+    world = _world(env)
+    return -(STEP_REWARD + WEATHER_PENALTY[world.weather_codes]).astype(np.float64)
+
+
+def shortest_route(env, start=None, goal=None, costs=None, heuristic=True):
+    """Cheapest building-free route from start to goal with weather costs as edge weights.
+
+    A* with a Manhattan heuristic (admissible since every move costs at least 1); heuristic=False gives
+    Dijkstra. costs overrides cell_costs(env). Returns (route as a list of (col, row), total cost), or
+    (None, inf) when the goal cannot be reached.
+    """
+    world = _world(env)
+    G = world.gridNum
+    start = tuple(start) if start is not None else world.start_pos
+    goal = tuple(goal) if goal is not None else world.goal_pos
+    cost = (costs if costs is not None else cell_costs(world)).tolist()
+    blocked = world.building_mask.tolist()
+    min_cost = 1.0 if heuristic else 0.0
+    deltas = [tuple(d) for d in ACTION_DELTAS.tolist()]
+
+    best = {start: 0.0}
+    parent = {start: None}
+    frontier = [(min_cost * (abs(start[0] - goal[0]) + abs(start[1] - goal[1])), 0.0, start)]
+    while frontier:
+        _, g, cell = heapq.heappop(frontier)
+        if cell == goal:
+            route = []
+            while cell is not None:
+                route.append(cell)
+                cell = parent[cell]
+            return route[::-1], g
+        if g > best[cell]:
+            continue
+        col, row = cell
+        for dcol, drow in deltas:
+            ncol, nrow = col + dcol, row + drow
+            if not (0 <= ncol < G and 0 <= nrow < G) or blocked[ncol][nrow]:
+                continue
+            ng = g + cost[ncol][nrow]
+            nxt = (ncol, nrow)
+            if ng < best.get(nxt, float('inf')):
+                best[nxt] = ng
+                parent[nxt] = cell
+                h = min_cost * (abs(ncol - goal[0]) + abs(nrow - goal[1]))
+                heapq.heappush(frontier, (ng + h, ng, nxt))
+    return None, float('inf')
+
+
+def greedy_route(q_table, env, start=None, max_len=None):
+    """Follow the argmax action of a Q-table from start; returns the visited cells, ending at the goal if reached."""
+    world = _world(env)
+    state = world.cell_index(tuple(start) if start is not None else world.start_pos)
+    max_len = max_len if max_len is not None else world.finished_index
+    route = [divmod(state, world.gridNum)]
+    for _ in range(max_len):
+        state = int(world.transitions[state, int(np.argmax(q_table[state]))])
+        if state == world.finished_index:
+            route.append(world.goal_pos)
+            break
+        if divmod(state, world.gridNum) == route[-1]:
+            # A blocked or clamped move: the greedy policy is stuck
+            break
+        route.append(divmod(state, world.gridNum))
+    return route
+
+
+def warm_start(agent, env=None):
+    """Initialise an Agent's Q-table with the value-iteration solution for its environment."""
+    q_table = value_iteration(env if env is not None else agent.env, reward_decay=agent.gamma)
+    if isinstance(agent.q_table, QTable.TiledQTable):
+        agent.q_table = QTable.TiledQTable.from_dense(q_table, agent.gridNum, agent.q_table.tile)
+    else:
+        agent.q_table[:] = q_table
+    return agent
+
+
+class DStarLite:
+    # Incremental route planner (D* Lite) that keeps its search state between calls.
+    # Edge costs are cell_costs(env) for entering a cell, plus bird_cost for a bird's cell and adjacent_cost for
+    # cells next to a bird (the -100 and -3 terms of the reward model); buildings are impassable.
+    # After update_birds() or set_costs() only the vertices whose edges changed are repaired, so replanning
+    # work grows with the size of the change rather than the size of the grid.
+    def __init__(self, env, start=None, goal=None, bird_cost=-BIRD_REWARD, adjacent_cost=-BIRD_ADJACENT_REWARD):
+        world = _world(env)
+        self.gridNum = G = world.gridNum
+        self.bird_cost = float(bird_cost)
+        self.adjacent_cost = float(adjacent_cost)
+        base = cell_costs(world)
+        base[world.building_mask] = np.inf
+        self.base_cost = base.ravel().tolist()
+        self.cost = list(self.base_cost)
+        self.neighbors = []
+        for index in range(G * G):
+            col, row = divmod(index, G)
+            self.neighbors.append([(col + dc) * G + row + dr for dc, dr in ACTION_DELTAS.tolist()
+                                   if 0 <= col + dc < G and 0 <= row + dr < G])
+        self.start = world.cell_index(tuple(start) if start is not None else world.start_pos)
+        self.goal = world.cell_index(tuple(goal) if goal is not None else world.goal_pos)
+        self.birds = []
+        self.km = 0.0
+        self.g = [np.inf] * (G * G)
+        self.rhs = [np.inf] * (G * G)
+        self.rhs[self.goal] = 0.0
+        self._open = {}
+        self._heap = []
+        self._push(self.goal)
+        # Vertices expanded by compute() over the planner's lifetime
+        self.expanded = 0
+
+    def _h(self, a, b):
+        # Manhattan distance; admissible since entering any cell costs at least 1
+        ca, ra = divmod(a, self.gridNum)
+        cb, rb = divmod(b, self.gridNum)
+        return abs(ca - cb) + abs(ra - rb)
+
+    def _key(self, s):
+        m = min(self.g[s], self.rhs[s])
+        return (m + self._h(self.start, s) + self.km, m)
+
+    def _push(self, s):
+        key = self._key(s)
+        self._open[s] = key
+        heapq.heappush(self._heap, (key, s))
+
+    def _top_key(self):
+        # Drop heap entries made stale by later pushes or removals
+        while self._heap and self._open.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else (np.inf, np.inf)
+
+    def _update_vertex(self, u):
+        if u != self.goal:
+            cost, g = self.cost, self.g
+            self.rhs[u] = min([cost[v] + g[v] for v in self.neighbors[u]], default=np.inf)
+        if self.g[u] != self.rhs[u]:
+            self._push(u)
+        else:
+            self._open.pop(u, None)
+
+    def compute(self):
+        """Repair g-values until the start's cost-to-goal is consistent."""
+        while self._top_key() < self._key(self.start) or self.rhs[self.start] != self.g[self.start]:
+            if not self._heap:
+                break
+            k_old, u = heapq.heappop(self._heap)
+            k_new = self._key(u)
+            self.expanded += 1
+            if k_old < k_new:
+                self._push(u)
+            elif self.g[u] > self.rhs[u]:
+                self.g[u] = self.rhs[u]
+                del self._open[u]
+                for p in self.neighbors[u]:
+                    self._update_vertex(p)
+            else:
+                self.g[u] = np.inf
+                self._update_vertex(u)
+                for p in self.neighbors[u]:
+                    self._update_vertex(p)
+
+    def route(self):
+        """Current best route from start to goal as (list of (col, row), cost), or (None, inf) if unreachable."""
+        self.compute()
+        if self.g[self.start] == np.inf:
+            return None, float('inf')
+        G = self.gridNum
+        s, total = self.start, 0.0
+        route = [divmod(s, G)]
+        while s != self.goal:
+            s = min(self.neighbors[s], key=lambda v: self.cost[v] + self.g[v])
+            total += self.cost[s]
+            route.append(divmod(s, G))
+        return route, total
+
+    def move_start(self, cell):
+        """The drone moved; subsequent routes start from cell."""
+        new_start = cell[0] * self.gridNum + cell[1]
+        self.km += self._h(self.start, new_start)
+        self.start = new_start
+
+    def set_costs(self, changes):
+        """Apply {cell index: entry cost} changes and queue the affected vertices for repair."""
+        for v, c in changes.items():
+            if self.cost[v] != c:
+                self.cost[v] = c
+                # Entering v got cheaper or dearer: every neighbour's outgoing edge into v changed
+                for u in self.neighbors[v]:
+                    self._update_vertex(u)
+
+    def update_birds(self, positions):
+        """Move the bird overlay to new [col, row] positions; only cells near old or new birds are touched."""
+        G = self.gridNum
+        new_birds = [int(c) * G + int(r) for c, r in positions]
+        touched = set()
+        for b in self.birds + new_birds:
+            touched.add(b)
+            touched.update(self.neighbors[b])
+        occupied = set(new_birds)
+        adjacent = set(v for b in new_birds for v in self.neighbors[b])
+        changes = {}
+        for v in touched:
+            changes[v] = (self.base_cost[v] + self.bird_cost * (v in occupied)
+                          + self.adjacent_cost * (v in adjacent))
+        self.birds = new_birds
+        self.set_costs(changes)
+
+    def cost_grid(self):
+        """Current entry costs as a (gridNum, gridNum) array, e.g. for shortest_route(costs=...)."""
+        return np.array(self.cost).reshape(self.gridNum, self.gridNum)
+
+
+if __name__ == "__main__":
+    import time
+    world = GridWorld()
+    t0 = time.perf_counter()
+    route, cost = shortest_route(world)
+    t1 = time.perf_counter()
+    q_table = value_iteration(world)
+    t2 = time.perf_counter()
+    print('A* route (%.3f ms, cost %.1f): %s' % ((t1 - t0) * 1000, cost, route))
+    print('Value iteration (%.3f ms) greedy route: %s' % ((t2 - t1) * 1000, greedy_route(q_table, world)))
+    planner = DStarLite(world)
+    planner.update_birds(world.blacks)
+    planner.route()
+    for _ in range(5):
+        world.move_blacks()
+        t0 = time.perf_counter()
+        planner.update_birds(world.blacks)
+        route, cost = planner.route()
+        print('D* Lite replan after bird move (%.3f ms, cost %.1f)' % ((time.perf_counter() - t0) * 1000, cost))
@@ -0,0 +1,184 @@
+import argparse
+import asyncio
+import json
+import numpy as np
+import Planner
+
+
+class Policy:
+    # A frozen greedy policy compiled from a Q-table: the argmax action of every cell, the cell it leads to
+    # under the static model (buildings and grid edges, no birds) and the number of steps from every cell to the
+    # goal (-1 where the greedy policy never gets there). Queries are plain array lookups: no epsilon, no
+    # printing, no Agent. Routes to any other goal fall back to Planner.shortest_route on the stored layout.
+    # Exposes gridNum, start_pos, goal_pos, building_mask and weather_codes, so Planner functions accept it as an env.
+    def __init__(self, actions, successors, gridNum, start_pos, goal_pos, building_mask, weather_codes):
+        self.gridNum = gridNum
+        self.start_pos = tuple(start_pos)
+        self.goal_pos = tuple(goal_pos)
+        self.building_mask = np.asarray(building_mask, dtype=bool)
+        self.weather_codes = np.asarray(weather_codes, dtype=np.uint8)
+        self.finished_index = gridNum * gridNum
+        # Per flat cell index col * gridNum + row, plus the absorbing 'finished' entry
+        self.actions = np.asarray(actions, dtype=np.int8)
+        self.successors = np.asarray(successors, dtype=np.int64)
+        self.steps_to_goal = self._steps_to_goal()
+        # Plain-list copies for the single-query path: indexing lists beats NumPy scalar access
+        self._action_list = self.actions.tolist()
+        self._successor_list = self.successors.tolist()
+
+    @classmethod
+    def from_q_table(cls, q_table, env):
+        """Compile the greedy policy of a dense or tiled Q-table for env's layout."""
+        world = getattr(env, 'world', env)
+        actions = np.asarray(q_table).argmax(axis=1)
+        actions[world.finished_index] = 0
+        successors = world.transitions[np.arange(len(actions)), actions]
+        return cls(actions, successors, world.gridNum, world.start_pos, world.goal_pos, world.building_mask,
+                   world.weather_codes)
+
+    @classmethod
+    def from_agent(cls, agent, env=None):
+        return cls.from_q_table(agent.q_table, env if env is not None else agent.env)
+
+    def _steps_to_goal(self):
+        # Walk every cell's greedy chain at once; a cell gets a count once its successor has one
+        steps = np.full(len(self.successors), -1, dtype=np.int64)
+        steps[self.finished_index] = 0
+        while True:
+            known = (steps < 0) & (steps[self.successors] >= 0)
+            if not known.any():
+                return steps
+            steps[known] = steps[self.successors[known]] + 1
+
+    def cell_index(self, cell):
+        return int(cell[0]) * self.gridNum + int(cell[1])
+
+    def _outside(self, col, row):
+        return not (0 <= col < self.gridNum and 0 <= row < self.gridNum)
+
+    def next_action(self, cell):
+        """Greedy action (0 up, 1 down, 2 left, 3 right) from a (col, row) cell; ValueError outside the grid."""
+        col, row = cell
+        if self._outside(col, row):
+            raise ValueError('cell outside the %dx%d grid' % (self.gridNum, self.gridNum))
+        return self._action_list[col * self.gridNum + row]
+
+    def next_actions(self, cells):
+        """Greedy actions for an (n, 2) array of [col, row] cells; ValueError if any is outside the grid."""
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        if ((cells < 0) | (cells >= self.gridNum)).any():
+            raise ValueError('cell outside the %dx%d grid' % (self.gridNum, self.gridNum))
+        return self.actions[cells[:, 0] * self.gridNum + cells[:, 1]]
+
+    def route(self, start=None, goal=None):
+        """(list of (col, row) cells from start to goal, number of moves), or (None, -1) if there is no route.
+
+        Routes to the policy's goal follow the compiled policy; any other goal is planned with A*. Building cells
+        cannot be entered, so there is no route from or to one. ValueError if start or goal is outside the grid.
+        """
+        start = tuple(start) if start is not None else self.start_pos
+        goal = tuple(goal) if goal is not None else self.goal_pos
+        if self._outside(*start) or self._outside(*goal):
+            raise ValueError('cell outside the %dx%d grid' % (self.gridNum, self.gridNum))
+        if self.building_mask[start] or self.building_mask[goal]:
+            return None, -1
+        if start == goal:
+            return [goal], 0
+        if goal != self.goal_pos:
+            route, _ = Planner.shortest_route(self, start, goal)
+            return (route, len(route) - 1) if route is not None else (None, -1)
+        state = self.cell_index(start)
+        n = int(self.steps_to_goal[state])
+        if n < 0:
+            return None, -1
+        G = self.gridNum
+        route = [start]
+        for _ in range(n - 1):
+            state = self._successor_list[state]
+            route.append(divmod(state, G))
+        route.append(self.goal_pos)
+        return route, n
+
+    def _check_cells(self, cells):
+        # cells: a list of [col, row] pairs of ints, inside the grid and not buildings
+        if not isinstance(cells, list) or not all(
+                isinstance(c, list) and len(c) == 2 and all(type(v) is int for v in c) for c in cells):
+            raise ValueError('cells must be [col, row] pairs of ints')
+        cells = np.array(cells, dtype=np.int64).reshape(-1, 2)
+        if ((cells < 0) | (cells >= self.gridNum)).any():
+            raise ValueError('cell outside the %dx%d grid' % (self.gridNum, self.gridNum))
+        if self.building_mask[cells[:, 0], cells[:, 1]].any():
+            raise ValueError('cell is a building')
+        return cells
+
+    def save(self, path):
+        np.savez_compressed(path, actions=self.actions, successors=self.successors, gridNum=self.gridNum,
+                            start_pos=self.start_pos, goal_pos=self.goal_pos, building_mask=self.building_mask,
+                            weather_codes=self.weather_codes)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['actions'], data['successors'], int(data['gridNum']), data['start_pos'].tolist(),
+                       data['goal_pos'].tolist(), data['building_mask'], data['weather_codes'])
+
+    def handle(self, request):
+        """Answer one query dict; used by the server, also callable in-process.
+
+        {"op": "next_action", "cells": [[col, row], ...]} -> {"actions": [...]}
+        {"op": "route", "start": [col, row], "goal": [col, row]} -> {"route": [[col, row], ...], "moves": n}
+        """
+        if not isinstance(request, dict):
+            raise ValueError('request must be a JSON object')
+        op = request.get('op')
+        if op == 'next_action':
+            cells = self._check_cells(request['cells'])
+            return {'actions': self.next_actions(cells).tolist()}
+        if op == 'route':
+            start, goal = request.get('start'), request.get('goal')
+            self._check_cells([c for c in (start, goal) if c is not None])
+            route, moves = self.route(start, goal)
+            return {'route': [list(map(int, c)) for c in route] if route is not None else None, 'moves': moves}
+        raise ValueError('Unknown op: %r' % (op,))
+
+
+async def _serve_client(policy, reader, writer):
+    # One JSON request per line, one JSON response per line; errors are reported without dropping the connection
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                response = policy.handle(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                response = {'error': str(e)}
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(policy, host='127.0.0.1', port=8765):
+    """Serve JSON-lines queries over TCP until cancelled."""
+    server = await asyncio.start_server(lambda r, w: _serve_client(policy, r, w), host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Query or serve a frozen policy exported with Policy.save')
+    parser.add_argument('policy')
+    sub = parser.add_subparsers(dest='command', required=True)
+    route = sub.add_parser('route')
+    route.add_argument('--start', type=int, nargs=2)
+    route.add_argument('--goal', type=int, nargs=2)
+    server = sub.add_parser('serve')
+    server.add_argument('--host', default='127.0.0.1')
+    server.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    policy = Policy.load(args.policy)
+    if args.command == 'route':
+        print(json.dumps(policy.handle({'op': 'route', 'start': args.start, 'goal': args.goal})))
+    else:
+        asyncio.run(serve(policy, args.host, args.port))
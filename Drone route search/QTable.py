@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+
+# Dense Q-tables are indexed by integer state: col * gridNum + row for grid cells and
+# gridNum * gridNum for the terminal 'finished' state, matching the row order of Qtable.csv
+
+# Grids with more cells than this get a TiledQTable by default instead of a dense array
+DENSE_LIMIT = 1 << 16
+
+
+def state_count(gridNum):
+    """Number of Q-table rows: every grid cell plus 'finished'."""
+    return gridNum * gridNum + 1
+
+
+def cell_index(col, row, gridNum):
+    return col * gridNum + row
+
+
+def legacy_key(col, row, gridWidth):
+    """Canonical string key of a cell in the legacy CSV format, e.g. "[0.0, 0.0, 80.0, 80.0]"."""
+    x0, y0 = col * gridWidth, row * gridWidth
+    x1, y1 = (col + 1) * gridWidth, (row + 1) * gridWidth
+    return f"[{x0:.1f}, {y0:.1f}, {x1:.1f}, {y1:.1f}]"
+
+
+def parse_legacy_key(key, gridWidth):
+    """(col, row) of a legacy canvas-coordinate key, or None for 'finished' and unparseable keys."""
+    key = key.strip()
+    if not key.startswith('['):
+        return None
+    try:
+        x0, y0, x1, y1 = [float(v) for v in key.strip('[]').split(',')]
+    except ValueError:
+        return None
+    return int((x0 + x1) / 2.0 // gridWidth), int((y0 + y1) / 2.0 // gridWidth)
+
+
+def to_frame(q_table, gridNum, gridWidth):
+    """Export a dense or tiled Q-table as a DataFrame indexed by legacy string keys."""
+    states = [legacy_key(c, r, gridWidth) for c in range(gridNum) for r in range(gridNum)]
+    states.append('finished')
+    return pd.DataFrame(np.asarray(q_table)[:len(states)], index=states, columns=range(q_table.shape[1]))
+
+
+def from_frame(frame, gridNum, gridWidth, n_actions, dtype=np.float64):
+    """Import a legacy DataFrame into a dense Q-table; unknown rows are dropped, missing rows are zero."""
+    q_table = np.zeros((state_count(gridNum), n_actions), dtype=dtype)
+    # read_csv yields string column labels, DataFrames built in memory use ints
+    columns = {}
+    for label in frame.columns:
+        try:
+            columns[int(label)] = label
+        except (TypeError, ValueError):
+            continue
+    cols = [a for a in range(n_actions) if a in columns]
+    values = frame[[columns[a] for a in cols]].to_numpy(dtype=dtype, na_value=0.0)
+    for key, row_values in zip(frame.index, values):
+        if key == 'finished':
+            index = gridNum * gridNum
+        else:
+            cell = parse_legacy_key(str(key), gridWidth)
+            if cell is None or not (0 <= cell[0] < gridNum and 0 <= cell[1] < gridNum):
+                continue
+            index = cell_index(cell[0], cell[1], gridNum)
+        q_table[index, cols] = row_values
+    return q_table
+
+
+def save_csv(q_table, path, gridNum, gridWidth):
+    to_frame(q_table, gridNum, gridWidth).to_csv(path)
+
+
+def load_csv(path, gridNum, gridWidth, n_actions, dtype=np.float64):
+    return from_frame(pd.read_csv(path, index_col=0), gridNum, gridWidth, n_actions, dtype)
+
+
+class TiledQTable:
+    # Sparse Q-table for large grids: square tiles of tile x tile cells are allocated on first write, so memory
+    # follows the visited part of the map. Supports the indexing Agent uses on a dense table:
+    # q[s] (a row), q[s, a] (a value) and q[s, a] = v; unvisited rows read as zeros.
+    def __init__(self, gridNum, n_actions, tile=64, dtype=np.float64):
+        self.gridNum = gridNum
+        self.tile = tile
+        self.dtype = np.dtype(dtype)
+        self.shape = (state_count(gridNum), n_actions)
+        # (tile_col, tile_row) -> (tile, tile, n_actions) array
+        self.tiles = {}
+        self.finished = np.zeros(n_actions, dtype=self.dtype)
+        self._zero = np.zeros(n_actions, dtype=self.dtype)
+        self._zero.flags.writeable = False
+
+    def row(self, s, allocate=False):
+        """Q-values of state s as a writable view when allocated; a shared read-only zero row otherwise."""
+        if s == self.shape[0] - 1:
+            return self.finished
+        col, row = divmod(s, self.gridNum)
+        key = (col // self.tile, row // self.tile)
+        block = self.tiles.get(key)
+        if block is None:
+            if not allocate:
+                return self._zero
+            block = self.tiles[key] = np.zeros((self.tile, self.tile, self.shape[1]), dtype=self.dtype)
+        return block[col % self.tile, row % self.tile]
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            s, a = key
+            return self.row(s)[a]
+        return self.row(key)
+
+    def __setitem__(self, key, value):
+        if isinstance(key, tuple):
+            s, a = key
+            self.row(s, allocate=True)[a] = value
+        else:
+            self.row(key, allocate=True)[:] = value
+
+    @property
+    def nbytes(self):
+        return sum(block.nbytes for block in self.tiles.values()) + self.finished.nbytes
+
+    def copy(self):
+        """Independent copy holding only the allocated tiles."""
+        other = TiledQTable(self.gridNum, self.shape[1], self.tile, self.dtype)
+        other.tiles = {key: block.copy() for key, block in self.tiles.items()}
+        other.finished[:] = self.finished
+        return other
+
+    def to_dense(self):
+        G, T = self.gridNum, self.tile
+        dense = np.zeros(self.shape, dtype=self.dtype)
+        cells = dense[:-1].reshape(G, G, self.shape[1])
+        for (tc, tr), block in self.tiles.items():
+            part = cells[tc * T:(tc + 1) * T, tr * T:(tr + 1) * T]
+            part[:] = block[:part.shape[0], :part.shape[1]]
+        dense[-1] = self.finished
+        return dense
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self.to_dense()
+        return dense if dtype is None else dense.astype(dtype)
+
+    @classmethod
+    def from_dense(cls, q_table, gridNum, tile=64):
+        """Tile a dense table, allocating only tiles that hold a non-zero value."""
+        q_table = np.asarray(q_table)
+        tiled = cls(gridNum, q_table.shape[1], tile=tile, dtype=q_table.dtype)
+        cells = q_table[:-1].reshape(gridNum, gridNum, q_table.shape[1])
+        for tc in range(0, gridNum, tile):
+            for tr in range(0, gridNum, tile):
+                part = cells[tc:tc + tile, tr:tr + tile]
+                if part.any():
+                    block = tiled.tiles[(tc // tile, tr // tile)] = np.zeros((tile, tile, q_table.shape[1]), dtype=q_table.dtype)
+                    block[:part.shape[0], :part.shape[1]] = part
+        tiled.finished[:] = q_table[-1]
+        return tiled
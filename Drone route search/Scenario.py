@@ -0,0 +1,255 @@
+import argparse
+import hashlib
+import json
+import os
+import struct
+from collections import deque
+
+import numpy as np
+
+from World import GridWorld, WEATHER_TYPES, CLOUDY, default_weather_raster
+
+
+# Binary scenario file: a 64-byte header followed by the payload
+#   payload = weather raster (gridNum^2 uint8) + building mask (np.packbits, ceil(gridNum^2 / 8) bytes)
+#             + bird starts (n_birds x 2 little-endian int32)
+# Header fields (little-endian): magic 'DRSC', version, gridNum, n_birds, start col/row, goal col/row,
+# 16-byte blake2b hash of the payload and the start/goal/size fields. The hash identifies a scenario's content.
+MAGIC = b'DRSC'
+VERSION = 1
+HEADER_SIZE = 64
+_HEADER = struct.Struct('<4sIIIIIII16s')
+
+WEATHER_PATTERNS = ('quadrants', 'patches', 'random', 'clear')
+
+
+def weather_pattern(gridNum, pattern='patches', rng=None, patch=8):
+    """uint8 weather raster: the default quadrants, random square patches of patch x patch cells, iid cells or
+    all cloudy."""
+    rng = rng if rng is not None else np.random.default_rng()
+    if pattern == 'quadrants':
+        return default_weather_raster(gridNum)
+    if pattern == 'clear':
+        return np.full((gridNum, gridNum), CLOUDY, dtype=np.uint8)
+    if pattern == 'random':
+        return rng.integers(0, len(WEATHER_TYPES), (gridNum, gridNum), dtype=np.uint8)
+    if pattern == 'patches':
+        coarse = -(-gridNum // patch)
+        codes = rng.integers(0, len(WEATHER_TYPES), (coarse, coarse), dtype=np.uint8)
+        return np.repeat(np.repeat(codes, patch, axis=0), patch, axis=1)[:gridNum, :gridNum].copy()
+    raise ValueError('Unknown weather pattern: %r' % (pattern,))
+
+
+def reachable(building_mask, start, goal):
+    """Whether goal can be reached from start through building-free cells (4-connected BFS)."""
+    G = building_mask.shape[0]
+    start, goal = start[0] * G + start[1], goal[0] * G + goal[1]
+    free = bytearray((~building_mask).ravel().tobytes())
+    if not (free[start] and free[goal]):
+        return False
+    free[start] = 0
+    queue = deque([start])
+    while queue:
+        cell = queue.popleft()
+        if cell == goal:
+            return True
+        col, row = divmod(cell, G)
+        for n, ok in ((cell - 1, row > 0), (cell + 1, row < G - 1), (cell - G, col > 0), (cell + G, col < G - 1)):
+            if ok and free[n]:
+                free[n] = 0
+                queue.append(n)
+    return False
+
+
+class Scenario:
+    # A complete world description: building mask, weather raster, bird starts, start and goal. Scenarios are
+    # values: two with the same content have the same content_hash, whatever produced them.
+    def __init__(self, building_mask, weather_codes, birds, start_pos, goal_pos):
+        self.building_mask = np.asarray(building_mask, dtype=bool)
+        self.weather_codes = np.asarray(weather_codes, dtype=np.uint8)
+        self.gridNum = self.building_mask.shape[0]
+        self.birds = np.asarray(birds, dtype=np.int64).reshape(-1, 2)
+        self.start_pos = (int(start_pos[0]), int(start_pos[1]))
+        self.goal_pos = (int(goal_pos[0]), int(goal_pos[1]))
+        self._hash = None
+
+    @classmethod
+    def generate(cls, gridNum=12, num_buildings=22, weather='quadrants', n_birds=4, start_pos=(0, 0), goal_pos=None,
+                 seed=0, max_tries=100):
+        """Seeded random scenario whose goal is reachable from the start.
+
+        Buildings and birds avoid the start and goal; buildings also avoid the birds. The goal defaults to the
+        usual (9, 9), pulled inside smaller grids. Layouts are redrawn (from the same generator) until the goal is
+        reachable; ValueError after max_tries.
+        """
+        rng = np.random.default_rng(seed)
+        G = gridNum
+        goal_pos = goal_pos if goal_pos is not None else (min(9, G - 1), min(9, G - 1))
+        n_cells = G * G
+        keep_free = np.array([start_pos[0] * G + start_pos[1], goal_pos[0] * G + goal_pos[1]])
+        weather_codes = weather_pattern(G, weather, rng)
+        for _ in range(max_tries):
+            # A random priority per cell: birds take the lowest, buildings the next lowest, after excluding the
+            # start and goal
+            priority = rng.random(n_cells)
+            priority[keep_free] = np.inf
+            order = np.argpartition(priority, min(n_birds + num_buildings, n_cells - 1))[:n_birds + num_buildings]
+            order = order[np.argsort(priority[order])]
+            order = order[np.isfinite(priority[order])]
+            birds = np.stack(np.divmod(order[:n_birds], G), axis=1)
+            mask = np.zeros(n_cells, dtype=bool)
+            mask[order[n_birds:]] = True
+            mask = mask.reshape(G, G)
+            if reachable(mask, start_pos, goal_pos):
+                return cls(mask, weather_codes, birds, start_pos, goal_pos)
+        raise ValueError('No reachable layout in %d tries' % max_tries)
+
+    def world(self, **kwargs):
+        """A GridWorld over this scenario; kwargs go to GridWorld (e.g. bird_every, bird_seed)."""
+        return GridWorld(gridNum=self.gridNum, start_pos=self.start_pos, goal_pos=self.goal_pos,
+                         weather_codes=self.weather_codes, building_mask=self.building_mask, birds=self.birds, **kwargs)
+
+    @classmethod
+    def from_world(cls, world):
+        world = getattr(world, 'world', world)
+        return cls(world.building_mask, world.weather_codes, world.blacks, world.start_pos, world.goal_pos)
+
+    def _payload(self):
+        return (self.weather_codes.tobytes() + np.packbits(self.building_mask.ravel()).tobytes()
+                + self.birds.astype('<i4').tobytes())
+
+    def _fields(self):
+        return (self.gridNum, len(self.birds)) + self.start_pos + self.goal_pos
+
+    @property
+    def content_hash(self):
+        """Hex blake2b digest of the scenario's content."""
+        if self._hash is None:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(struct.pack('<6I', *self._fields()))
+            digest.update(self._payload())
+            self._hash = digest.digest()
+        return self._hash.hex()
+
+    def to_bytes(self):
+        header = _HEADER.pack(MAGIC, VERSION, *self._fields(), bytes.fromhex(self.content_hash))
+        return header.ljust(HEADER_SIZE, b'\0') + self._payload()
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER_SIZE:
+            raise ValueError('truncated scenario header')
+        magic, version, G, n_birds, sc, sr, gc, gr, digest = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('not a scenario file')
+        if version != VERSION:
+            raise ValueError('unsupported scenario version %d' % version)
+        n_cells = G * G
+        offset = HEADER_SIZE
+        weather = np.frombuffer(data, dtype=np.uint8, count=n_cells, offset=offset).reshape(G, G)
+        offset += n_cells
+        packed = np.frombuffer(data, dtype=np.uint8, count=-(-n_cells // 8), offset=offset)
+        offset += len(packed)
+        mask = np.unpackbits(packed, count=n_cells).astype(bool).reshape(G, G)
+        birds = np.frombuffer(data, dtype='<i4', count=2 * n_birds, offset=offset).reshape(-1, 2)
+        scenario = cls(mask, weather, birds, (sc, sr), (gc, gr))
+        if scenario.content_hash != digest.hex():
+            raise ValueError('scenario content does not match its hash')
+        return scenario
+
+    def save(self, path):
+        # Same write-then-rename as Checkpoint.save, so readers never see a partial file
+        tmp = '%s.tmp-%d' % (path, os.getpid())
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(self.to_bytes())
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+class ScenarioCache:
+    # On-disk LRU cache of generated scenarios. Files are named by content hash; index.json maps the generation
+    # parameters to that hash so a repeated generate() request is a single file read. Entries beyond max_entries
+    # are evicted least recently used first (a hit refreshes the file's modification time).
+    def __init__(self, directory, max_entries=64):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, 'index.json')
+
+    def path(self, content_hash):
+        return os.path.join(self.directory, content_hash + '.scn')
+
+    def _read_index(self):
+        try:
+            with open(self._index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index):
+        tmp = '%s.tmp-%d' % (self._index_path, os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp, self._index_path)
+
+    def get(self, content_hash):
+        """Cached scenario by content hash, or None."""
+        path = self.path(content_hash)
+        try:
+            scenario = Scenario.load(path)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        return scenario
+
+    def put(self, scenario):
+        path = self.path(scenario.content_hash)
+        if not os.path.exists(path):
+            scenario.save(path)
+        else:
+            os.utime(path)
+        self._evict()
+        return scenario.content_hash
+
+    def generate(self, **params):
+        """Scenario.generate(**params), served from the cache when the same parameters were generated before."""
+        key = json.dumps(params, sort_keys=True, default=list)
+        index = self._read_index()
+        if key in index:
+            scenario = self.get(index[key])
+            if scenario is not None:
+                return scenario
+        scenario = Scenario.generate(**params)
+        index[key] = self.put(scenario)
+        self._write_index(index)
+        return scenario
+
+    def _evict(self):
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.scn')]
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_entries]:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate a seeded scenario file')
+    parser.add_argument('path')
+    parser.add_argument('--grid-num', type=int, default=12)
+    parser.add_argument('--num-buildings', type=int, default=22)
+    parser.add_argument('--weather', default='quadrants', choices=WEATHER_PATTERNS)
+    parser.add_argument('--birds', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    scenario = Scenario.generate(args.grid_num, args.num_buildings, args.weather, args.birds, seed=args.seed)
+    scenario.save(args.path)
+    print('%s: %dx%d, hash %s' % (args.path, scenario.gridNum, scenario.gridNum, scenario.content_hash))
@@ -0,0 +1,175 @@
+import numpy as np
+import Checkpoint
+import QTable
+
+
+# Warm-starting a Q-table learned on one layout for another: the old values are kept wherever they still apply
+# and only the states affected by a weather, building or goal change are re-evaluated against the static model
+# (the same transition and shaped-reward tables as Planner.value_iteration). Changes are propagated to
+# predecessor states only while values keep moving by more than tol ("local Bellman repair"), so a small
+# weather update touches a small part of the table. Tables from other grid sizes are resampled first.
+# Functions accept a GridWorld, anything wrapping one as .world (e.g. Layout.InitLayout) or, for the old
+# layout, a Scenario.
+
+
+def _world(env):
+    # A Scenario has a world() method rather than a .world attribute, and already carries the layout arrays
+    return env if hasattr(env, 'building_mask') else env.world
+
+
+def _dilate(mask):
+    # mask plus its 4-neighbours: the cells that can move into a cell of mask, and the cells themselves
+    grown = mask.copy()
+    grown[1:, :] |= mask[:-1, :]
+    grown[:-1, :] |= mask[1:, :]
+    grown[:, 1:] |= mask[:, :-1]
+    grown[:, :-1] |= mask[:, 1:]
+    return grown
+
+
+def changed_cells(old_env, new_env):
+    """(gridNum, gridNum) mask of cells whose weather or building differs; every cell if the goal moved."""
+    old, new = _world(old_env), _world(new_env)
+    if old.building_mask.shape != new.building_mask.shape:
+        raise ValueError('layouts have different grid sizes; resample the Q-table first')
+    if tuple(old.goal_pos) != tuple(new.goal_pos):
+        return np.ones(new.building_mask.shape, dtype=bool)
+    return (old.weather_codes != new.weather_codes) | (old.building_mask != new.building_mask)
+
+
+def dirty_states(changed):
+    """Cells whose Q-row depends on a changed cell: the changed cells and their neighbours, whose moves enter them."""
+    return _dilate(np.asarray(changed, dtype=bool))
+
+
+def repair(q_table, env, dirty, reward_decay=0.9, tol=1e-3, max_sweeps=None):
+    """Re-evaluate the rows of dirty states in place, then every predecessor of a state whose value moved by
+    more than tol, until nothing moves. Returns {'sweeps': ..., 'backups': ...} (backups counts state rows).
+
+    q_table is a dense (gridNum^2 + 1, actions) array; the 'finished' row stays 0. Birds are not part of the
+    static model, so repaired rows carry no bird penalties until training sees them again.
+    """
+    world = _world(env)
+    G = world.gridNum
+    transitions = world.transitions
+    rewards = world.shaped_rewards.astype(q_table.dtype)
+    values = q_table.max(axis=1)
+    values[world.finished_index] = 0
+    frontier = np.flatnonzero(dirty)
+    max_sweeps = max_sweeps if max_sweeps is not None else 4 * G * G
+    sweeps = backups = 0
+    while frontier.size and sweeps < max_sweeps:
+        rows = rewards[frontier] + reward_decay * values[transitions[frontier]]
+        q_table[frontier] = rows
+        new_values = rows.max(axis=1)
+        moved = np.zeros(G * G, dtype=bool)
+        moved[frontier[np.abs(new_values - values[frontier]) > tol]] = True
+        values[frontier] = new_values
+        frontier = np.flatnonzero(_dilate(moved.reshape(G, G)))
+        sweeps += 1
+        backups += len(rows)
+    return {'sweeps': sweeps, 'backups': backups}
+
+
+def resample(q_table, old_gridNum, new_gridNum):
+    """Nearest-cell resampling of a Q-table between grid sizes; each new cell takes the row of the old cell
+    under its centre. Actions keep their meaning, and 'finished' stays 0."""
+    q_table = np.asarray(q_table)
+    col, row = np.divmod(np.arange(new_gridNum * new_gridNum), new_gridNum)
+    old_col = (2 * col + 1) * old_gridNum // (2 * new_gridNum)
+    old_row = (2 * row + 1) * old_gridNum // (2 * new_gridNum)
+    resampled = np.zeros((QTable.state_count(new_gridNum), q_table.shape[1]), dtype=q_table.dtype)
+    resampled[:-1] = q_table[old_col * old_gridNum + old_row]
+    return resampled
+
+
+def _assign(agent, q_table):
+    # Same conversion as Planner.warm_start
+    if isinstance(agent.q_table, QTable.TiledQTable):
+        agent.q_table = QTable.TiledQTable.from_dense(q_table, agent.gridNum, agent.q_table.tile)
+    else:
+        agent.q_table = q_table.astype(agent.q_table.dtype, copy=False)
+
+
+def transfer(agent, old_env, new_env=None, q_table=None, tol=1e-3):
+    """Warm-start agent for new_env (default agent.env) from q_table (default agent.q_table) learned on
+    old_env, repairing only the states the layout change affects. Returns the repair stats."""
+    new_env = new_env if new_env is not None else agent.env
+    q_table = np.array(q_table if q_table is not None else agent.q_table, dtype=np.float64)
+    stats = repair(q_table, new_env, dirty_states(changed_cells(old_env, new_env)), agent.gamma, tol)
+    _assign(agent, q_table)
+    return stats
+
+
+def load_checkpoint(agent, path, old_env=None, tol=1e-3):
+    """Load a binary Checkpoint into agent, adapting it to agent.env; returns the repair stats.
+
+    A checkpoint for another grid size is resampled and fully re-evaluated. Otherwise, when its layout hashes
+    differ from agent.env's, old_env (the layout it was trained on, e.g. a saved Scenario) limits the repair to
+    the changed cells; without a matching old_env every state is re-evaluated, starting from the old values.
+    """
+    q_table, header = Checkpoint.load(path)
+    q_table = np.array(q_table, dtype=np.float64)
+    world = _world(agent.env)
+    hashes = (header['weather_hash'], header['layout_hash'])
+    if header['actions'] != len(agent.actions):
+        raise ValueError('%s: checkpoint has %d actions' % (path, header['actions']))
+    if header['gridNum'] != world.gridNum:
+        q_table = resample(q_table, header['gridNum'], world.gridNum)
+        dirty = np.ones(world.building_mask.shape, dtype=bool)
+    elif hashes == (Checkpoint.weather_hash(world), Checkpoint.layout_hash(world)):
+        dirty = np.zeros(world.building_mask.shape, dtype=bool)
+    elif old_env is not None and hashes == (Checkpoint.weather_hash(_world(old_env)), Checkpoint.layout_hash(_world(old_env))):
+        dirty = dirty_states(changed_cells(old_env, world))
+    else:
+        dirty = np.ones(world.building_mask.shape, dtype=bool)
+    stats = repair(q_table, world, dirty, agent.gamma, tol)
+    _assign(agent, q_table)
+    return stats
+
+
+if __name__ == "__main__":
+    import random
+    import main
+    from Agent import Agent
+    from Scenario import Scenario
+
+    # Train on one weather pattern, change the weather over a block of cells, then compare retraining from
+    # scratch with retraining from the repaired table: episodes until 8 of the last 10 reach the goal
+    def episodes_to_learn(world, agent, limit=400):
+        outcomes = []
+        for episode in range(1, limit + 1):
+            observation = world.reset()
+            for _ in range(2000):
+                action = agent.action_select(observation)
+                next_observation, reward, done = world.step(action)
+                agent.update_q_table(observation, action, reward, next_observation)
+                observation = next_observation
+                if done:
+                    break
+            outcomes.append(observation == 'finished')
+            if len(outcomes) >= 10 and sum(outcomes[-10:]) >= 8:
+                return episode
+        return limit
+
+    random.seed(0)
+    scenario = Scenario.generate(seed=0)
+    old_world = scenario.world(bird_seed=0)
+    agent = Agent(actions=range(4), env=old_world, verbose=False, learning_rate=0.1, epsilon=0.05, planning_steps=50)
+    main.start(old_world, agent, TOTAL_EXPLORE_EPOCH=300, qtable_path=None, csv_path=None, max_steps=2000, verbose=False)
+
+    weather = scenario.weather_codes.copy()
+    weather[2:6, 2:6] = 2  # snow
+    new_world = Scenario(scenario.building_mask, weather, scenario.birds, scenario.start_pos, scenario.goal_pos).world(bird_seed=0)
+    results = {}
+    for name in ('scratch', 'stale', 'transfer'):
+        random.seed(1)
+        new_world.birds.set_positions(scenario.birds)
+        fresh = Agent(actions=range(4), env=new_world, verbose=False, learning_rate=0.1, epsilon=0.05)
+        if name == 'stale':
+            fresh.q_table = np.array(agent.q_table)
+        elif name == 'transfer':
+            print('repair:', transfer(fresh, old_world, q_table=agent.q_table))
+        results[name] = episodes_to_learn(new_world, fresh)
+    print('episodes to 80%% success: scratch %d, stale table %d, repaired table %d' % (
+        results['scratch'], results['stale'], results['transfer']))
@@ -0,0 +1,252 @@
+import random
+from collections.abc import Mapping
+import numpy as np
+from Hazards import BirdScheduler
+
+
+# Weather categories in raster order; raster code i means WEATHER_TYPES[i], unknown cells are cloudy
+WEATHER_TYPES = ('cloudy', 'sunny', 'snow', 'rain')
+CLOUDY, SUNNY, SNOW, RAIN = range(len(WEATHER_TYPES))
+# Reward shaping Agent.update_q_table adds for entering a cell of each weather type
+WEATHER_PENALTY = np.array([0, 0, -5, -2])
+
+# Environment rewards
+STEP_REWARD = -1
+BUILDING_REWARD = -5
+GOAL_REWARD = 100
+BIRD_REWARD = -100
+# Agent.update_q_table penalty for ending next to a bird
+BIRD_ADJACENT_REWARD = -3
+
+# (dcol, drow) per action: up, down, left, right
+ACTION_DELTAS = np.array([[0, -1], [0, 1], [-1, 0], [1, 0]])
+_DELTAS = [tuple(d) for d in ACTION_DELTAS.tolist()]
+
+# Grids up to this many cells keep plain-list copies of the tables for the fastest step();
+# larger grids step arithmetically against the building mask and only build tables on demand
+LIST_TABLE_LIMIT = 1 << 16
+
+
+class WeatherView(Mapping):
+    """Read-only {(col, row): weather name} view over a uint8 weather raster, for code written against cell_weather."""
+
+    def __init__(self, raster):
+        self.raster = raster
+
+    def __getitem__(self, cell):
+        col, row = cell
+        if not (0 <= col < self.raster.shape[0] and 0 <= row < self.raster.shape[1]):
+            raise KeyError(cell)
+        return WEATHER_TYPES[self.raster[col, row]]
+
+    def __iter__(self):
+        for col in range(self.raster.shape[0]):
+            for row in range(self.raster.shape[1]):
+                yield (col, row)
+
+    def __len__(self):
+        return self.raster.size
+
+
+def weather_raster(cell_weather, gridNum):
+    """uint8 (gridNum, gridNum) array of weather codes indexed [col, row]."""
+    if isinstance(cell_weather, WeatherView) and cell_weather.raster.shape == (gridNum, gridNum):
+        return cell_weather.raster.copy()
+    codes = {name: i for i, name in enumerate(WEATHER_TYPES)}
+    raster = np.zeros((gridNum, gridNum), dtype=np.uint8)
+    for (col, row), cell_type in cell_weather.items():
+        if 0 <= col < gridNum and 0 <= row < gridNum:
+            raster[col, row] = codes.get(cell_type, 0)
+    return raster
+
+
+def default_weather_raster(gridNum):
+    """Quadrant weather layout as a raster: sunny left, cloudy right, snow top-right, rain bottom-left."""
+    raster = np.full((gridNum, gridNum), CLOUDY, dtype=np.uint8)
+    half = gridNum // 2
+    raster[:half, :] = SUNNY
+    raster[half:, :half] = SNOW
+    raster[:half, half:] = RAIN
+    return raster
+
+
+class GridWorld:
+    # Headless grid environment; states are integer (col, row) cells, the goal state is 'finished'
+    # gridNum: number of grid cells, gridWidth: width of each cell (only used by renderers and legacy keys)
+    # Weather is stored as a uint8 raster (weather_codes) and buildings as a bool occupancy array
+    # (building_mask), so memory stays at a few bytes per cell; pass weather_codes instead of cell_weather
+    # for large maps. cell_weather is then a read-only WeatherView over the raster.
+    # Birds move every bird_every steps of the simulation (see Hazards.BirdScheduler); bird_seed makes them reproducible.
+    # building_mask and birds replace the random buildings and the default bird starts (see Scenario.py).
+    def __init__(self, gridNum=12, gridWidth=80, objWidth=50, num_buildings=22, start_pos=(0,0), goal_pos=(9,9), weather='normal', cell_weather=None, bird_every=50,
+                 weather_codes=None, bird_seed=None, building_mask=None, birds=None):
+        self.weather = weather
+        # Generate weather distribution if not provided
+        if weather_codes is not None:
+            self.weather_codes = np.asarray(weather_codes, dtype=np.uint8)
+            cell_weather = WeatherView(self.weather_codes)
+        elif cell_weather is not None:
+            self.weather_codes = weather_raster(cell_weather, gridNum)
+        else:
+            self.weather_codes = default_weather_raster(gridNum)
+            cell_weather = WeatherView(self.weather_codes)
+        self.cell_weather = cell_weather
+        self.gridNum = gridNum
+        self.gridWidth = gridWidth
+        self.objWidth = objWidth
+        self.borderSize = self.gridNum * self.gridWidth
+        # 4 actions
+        self.action_space = ['up', 'down', 'left', 'right']
+        self.actions_num = len(self.action_space)
+        # Bird positions as an (n, 2) array of [col, row] grid indices; moved in place so renderers can share it
+        birds = birds if birds is not None else [[0, 2], [1, 2], [3, 0], [4, 4]]
+        self.birds = BirdScheduler(gridNum, birds, move_every=bird_every, seed=bird_seed)
+        self.blacks = self.birds.positions
+        # Store start and goal positions
+        self.start_pos = tuple(start_pos)
+        self.goal_pos = tuple(goal_pos)
+        self.finished_index = gridNum * gridNum
+        self._goal_index = self.cell_index(self.goal_pos)
+        n_cells = gridNum * gridNum
+        if building_mask is not None:
+            self.building_mask = np.asarray(building_mask, dtype=bool)
+            self.buildings = [tuple(c) for c in np.argwhere(self.building_mask).tolist()]
+        else:
+            # Generate buildings randomly, avoiding start, goal, and bird positions; sampling from a range
+            # keeps this O(num_buildings) even on million-cell maps
+            forbidden_cells = set([self.start_pos, self.goal_pos] + [tuple(b) for b in self.blacks])
+            forbidden = set(self.cell_index(c) for c in forbidden_cells if 0 <= c[0] < gridNum and 0 <= c[1] < gridNum)
+            num_buildings = min(num_buildings, n_cells - len(forbidden))
+            picks = random.sample(range(n_cells), min(n_cells, num_buildings + len(forbidden)))
+            self.buildings = [divmod(i, gridNum) for i in picks if i not in forbidden][:num_buildings]
+            self.building_mask = np.zeros((gridNum, gridNum), dtype=bool)
+            for col, row in self.buildings:
+                self.building_mask[col, row] = True
+        self._table_cache = None
+        self._transition_list = None
+        if n_cells <= LIST_TABLE_LIMIT:
+            self.build_tables()
+        self.agent_pos = self.start_pos
+        self._agent_index = self.cell_index(self.start_pos)
+        # Optional renderer (e.g. Layout.InitLayout); None means fully headless
+        self.renderer = None
+
+    # Transition/reward tables (see build_tables); large grids build them on first use
+    @property
+    def transitions(self):
+        return self._tables()['transitions']
+
+    @property
+    def rewards(self):
+        return self._tables()['rewards']
+
+    @property
+    def shaped_rewards(self):
+        return self._tables()['shaped_rewards']
+
+    @property
+    def blocked_moves(self):
+        return self._tables()['blocked_moves']
+
+    def _tables(self):
+        if self._table_cache is None:
+            self.build_tables()
+        return self._table_cache
+
+    def cell_index(self, cell):
+        """Flat index of a (col, row) cell; the same row numbering as Agent.q_table."""
+        return cell[0] * self.gridNum + cell[1]
+
+    def build_tables(self):
+        """Precompute the static parts of the world once per layout.
+
+        Arrays have one row per cell index plus a final absorbing 'finished' row (index gridNum**2):
+        transitions[s, a] is the next state after boundary clamping and building blocking (the goal maps to
+        'finished'), rewards[s, a] the environment reward without birds, and shaped_rewards[s, a] that reward
+        plus the weather adjustments Agent.update_q_table applies. Birds are the only thing left for step time.
+        """
+        G = self.gridNum
+        col, row = np.divmod(np.arange(G * G), G)
+        tgt_col = np.clip(col[:, None] + ACTION_DELTAS[:, 0], 0, G - 1)
+        tgt_row = np.clip(row[:, None] + ACTION_DELTAS[:, 1], 0, G - 1)
+        blocked = self.building_mask[tgt_col, tgt_row]
+        transitions = np.where(blocked, np.arange(G * G)[:, None], tgt_col * G + tgt_row)
+        entered_weather = self.weather_codes.ravel()[transitions]
+        rewards = np.where(blocked, BUILDING_REWARD, STEP_REWARD)
+        goal = ~blocked & (transitions == self.cell_index(self.goal_pos))
+        transitions[goal] = self.finished_index
+        rewards[goal] = GOAL_REWARD
+
+        # Weather shaping on the entered cell, skipped for 'finished'; sunny only boosts positive rewards
+        shaped = rewards + np.where(goal, 0, WEATHER_PENALTY[entered_weather])
+        sunny = ~goal & (rewards > 0) & (entered_weather == SUNNY)
+        shaped[sunny] = (rewards[sunny] * 1.5).astype(shaped.dtype)
+
+        absorbing = np.full((1, self.actions_num), self.finished_index)
+        self._table_cache = {
+            'transitions': np.vstack([transitions, absorbing]).astype(np.int32),
+            'rewards': np.vstack([rewards, np.zeros((1, self.actions_num))]).astype(np.int32),
+            'shaped_rewards': np.vstack([shaped, np.zeros((1, self.actions_num))]).astype(np.int32),
+            'blocked_moves': np.vstack([blocked, np.zeros((1, self.actions_num), dtype=bool)]),
+        }
+        if G * G <= LIST_TABLE_LIMIT:
+            # Plain-list copies: indexing Python lists is cheaper than NumPy scalar access in step()
+            self._transition_list = self.transitions.tolist()
+            self._reward_list = self.rewards.tolist()
+            self._cells = [(c, r) for c in range(G) for r in range(G)]
+
+    def reset(self):
+        self.agent_pos = self.start_pos
+        self._agent_index = self.cell_index(self.start_pos)
+        return self.agent_pos
+
+    def step(self, action):
+        self.birds.tick()
+        cur = self._agent_index
+        if self._transition_list is not None:
+            nxt = self._transition_list[cur][action]
+            reward = self._reward_list[cur][action]
+        else:
+            nxt, reward = self._move(cur, action)
+
+        # Reached destination
+        if nxt == self.finished_index:
+            self.agent_pos = self.goal_pos
+            self._agent_index = self._goal_index
+            return 'finished', reward, True
+        self._agent_index = nxt
+        self.agent_pos = self._cells[nxt] if self._transition_list is not None else divmod(nxt, self.gridNum)
+        # A building blocked the move: no movement, small penalty
+        if reward == BUILDING_REWARD:
+            return self.agent_pos, reward, False
+        # Collided with a bird
+        if self.birds.occupied[nxt]:
+            return self.agent_pos, BIRD_REWARD, True
+        return self.agent_pos, reward, False
+
+    def _move(self, cur, action):
+        """(next state, reward) of one move without the tables: clamp to the grid, then check buildings and goal."""
+        G = self.gridNum
+        col, row = divmod(cur, G)
+        dcol, drow = _DELTAS[action]
+        col = min(max(col + dcol, 0), G - 1)
+        row = min(max(row + drow, 0), G - 1)
+        if self.building_mask[col, row]:
+            return cur, BUILDING_REWARD
+        nxt = col * G + row
+        if nxt == self._goal_index:
+            return self.finished_index, GOAL_REWARD
+        return nxt, STEP_REWARD
+
+    def render(self):
+        if self.renderer is not None:
+            self.renderer.render()
+
+    def move_blacks(self):
+        # Each bird moves randomly one cell in a direction (up/down/left/right); reverse if out of bounds
+        self.birds.move()
+
+    def destroy(self):
+        if self.renderer is not None:
+            self.renderer.destroy()
+            self.renderer = None
@@ -1,19 +1,34 @@
 import os
+import sys
 import time
-import pandas as pd
-from Layout import InitLayout
+from World import GridWorld
 from Agent import Agent
 
 # Absolute directory of this script for consistent file I/O
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+QTABLE_PATH = os.path.join(SCRIPT_DIR, "Qtable.csv")
+# Binary checkpoint written during training (see Checkpoint.py); Qtable.csv is exported once at the end
+CHECKPOINT_PATH = os.path.join(SCRIPT_DIR, "Qtable.bin")
+# Frozen greedy policy written by --export-policy (see Policy.py)
+POLICY_PATH = os.path.join(SCRIPT_DIR, "policy.npz")
+# Layout the checkpoint was trained on (see Scenario.py), so the next run can repair it for a changed layout
+LAYOUT_PATH = os.path.join(SCRIPT_DIR, "Qtable.scn")
 
  
-def start():
-
-    TOTAL_EXPLORE_EPOCH = 200
-    # Total number of episodes/iterations
-    # Speed up first 80 epochs (no delay), then slow down for visualization
-    FAST_LEARNING_EPOCHS = 80
+def start(env, MyAgent, TOTAL_EXPLORE_EPOCH=200, FAST_LEARNING_EPOCHS=80, qtable_path=CHECKPOINT_PATH, max_steps=None, verbose=True,
+          csv_path=QTABLE_PATH, instrumentation=None):
+    # TOTAL_EXPLORE_EPOCH: total number of episodes/iterations
+    # FAST_LEARNING_EPOCHS: speed up the first epochs (no delay), then slow down for visualization;
+    # the delay is the renderer's step_delay and only applies while a renderer is attached, so one can be
+    # attached or detached mid-run
+    # qtable_path: binary checkpoint saved in the background during training (None disables saving)
+    # csv_path: legacy Qtable.csv export written when training ends (None disables it)
+    # max_steps: optional per-episode step limit; a truncated episode counts as a failure
+    # instrumentation: optional Instrument.Instrumentation timing the env, agent and checkpoint calls of this run
+    # Returns the summary metrics as a dict
+    checkpointer = MyAgent.checkpointer(qtable_path) if qtable_path else None
+    if instrumentation is not None:
+        instrumentation.attach(env, MyAgent, checkpointer)
 
     # Metrics: total rewards per episode, success count, steps per episode
     episode_rewards = []
@@ -32,24 +47,27 @@ def start():
             # Update canvas
             env.render()
 
-            action = MyAgent.action_select(str(observation))
+            action = MyAgent.action_select(observation)
             # Move agent and get reward
             next_observation, reward, done = env.step(action)
       
             # Update q-table
-            MyAgent.update_q_table(str(observation), action, reward, str(next_observation))
+            MyAgent.update_q_table(observation, action, reward, next_observation)
             observation = next_observation
 
             # Periodic save during long episodes so values stay visible
-            if steps % 20 == 0:
-                MyAgent.q_table.to_csv(os.path.join(SCRIPT_DIR, "Qtable.csv"))
+            if checkpointer and steps % 20 == 0:
+                checkpointer.request(MyAgent.q_table)
 
             # Speed up first 80 epochs, then add delay for visualization
-            if epoc >= FAST_LEARNING_EPOCHS:
-                time.sleep(0.1)
+            renderer = getattr(env, 'renderer', None)
+            if renderer is not None and renderer.step_delay and epoc >= FAST_LEARNING_EPOCHS:
+                time.sleep(renderer.step_delay)
             # Accumulate total reward and steps
             total_reward = total_reward + reward
             steps += 1
+            if max_steps is not None and steps >= max_steps:
+                done = True
 
             if done:
                 # Record metrics
@@ -58,9 +76,11 @@ def start():
                 if next_observation == 'finished':
                     success_count += 1
                     success_steps.append(steps)
-                print('==== epoch %d R: %.6f, steps: %d ====' %(epoc, total_reward, steps))
+                if verbose:
+                    print('==== epoch %d R: %.6f, steps: %d ====' %(epoc, total_reward, steps))
                 # Save at end of each episode to persist updates
-                MyAgent.q_table.to_csv(os.path.join(SCRIPT_DIR, "Qtable.csv"))
+                if checkpointer:
+                    checkpointer.request(MyAgent.q_table)
                 break
     # Summary metrics after training
     avg_reward = sum(episode_rewards)/len(episode_rewards) if episode_rewards else 0.0
@@ -72,47 +92,88 @@ def start():
     avg_steps = sum(episode_steps)/len(episode_steps) if episode_steps else 0.0
     success_rate = success_count / TOTAL_EXPLORE_EPOCH if TOTAL_EXPLORE_EPOCH > 0 else 0.0
     avg_success_steps = (sum(success_steps)/len(success_steps)) if success_steps else 0.0
-    print('==== Summary ====')
-    print('Episodes:', TOTAL_EXPLORE_EPOCH)
-    print('Success rate: %.2f%%' % (success_rate*100))
-    print('Average reward: %.3f' % avg_reward)
-    print('Average steps: %.2f' % avg_steps)
-    print('Reward std: %.3f' % reward_std)
-    print('Average steps (success only): %.2f' % avg_success_steps)
-
-    MyAgent.q_table.to_csv(os.path.join(SCRIPT_DIR, "Qtable.csv"))
+    if verbose:
+        print('==== Summary ====')
+        print('Episodes:', TOTAL_EXPLORE_EPOCH)
+        print('Success rate: %.2f%%' % (success_rate*100))
+        print('Average reward: %.3f' % avg_reward)
+        print('Average steps: %.2f' % avg_steps)
+        print('Reward std: %.3f' % reward_std)
+        print('Average steps (success only): %.2f' % avg_success_steps)
+
+    # The final table must be on disk before the environment goes away
+    if checkpointer:
+        checkpointer.request(MyAgent.q_table)
+        checkpointer.close()
+    if instrumentation is not None:
+        instrumentation.close()
+    if csv_path:
+        MyAgent.save_csv(csv_path)
     env.destroy()
+    return {
+        'episodes': TOTAL_EXPLORE_EPOCH,
+        'success_rate': success_rate,
+        'avg_reward': avg_reward,
+        'avg_steps': avg_steps,
+        'reward_std': reward_std,
+        'avg_success_steps': avg_success_steps,
+    }
 
 if __name__ == "__main__":
-    env = InitLayout()
-    MyAgent = Agent(actions=range(env.actions_num), weather=env.weather, cell_weather=env.cell_weather, env=env)
+    # Pass --headless to train without a display; otherwise a Tk window renders the world
+    headless = '--headless' in sys.argv[1:]
+    # Pass --warm-start to seed the Q-table with the exact value-iteration solution of the static layout
+    warm = '--warm-start' in sys.argv[1:]
+    # Pass --dyna to run 50 Dyna-Q planning backups per real step (fewer episodes to reach the goal reliably)
+    planning_steps = 50 if '--dyna' in sys.argv[1:] else 0
+    # Pass --fast-render to watch training at full speed: ~30 FPS, every 10th step, no delay or weather decorations
+    fast_render = '--fast-render' in sys.argv[1:]
+    # Pass --instrument to log per-phase timings, throughput and TD errors to instrument.jsonl every 10 episodes,
+    # and --profile to also write a cProfile dump of episodes 100-109 to profile.out
+    instrumentation = None
+    if '--instrument' in sys.argv[1:] or '--profile' in sys.argv[1:]:
+        from Instrument import Instrumentation
+        instrumentation = Instrumentation(os.path.join(SCRIPT_DIR, 'instrument.jsonl'),
+                                          profile_episodes=(100, 109) if '--profile' in sys.argv[1:] else None,
+                                          profile_path=os.path.join(SCRIPT_DIR, 'profile.out'))
+    world = GridWorld()
+    if not headless:
+        from Layout import InitLayout
+        if fast_render:
+            InitLayout(world=world, render_every=10, max_fps=30, step_delay=0, decorations=False)
+        else:
+            InitLayout(world=world)
+    env = world
+    MyAgent = Agent(actions=range(env.actions_num), weather=env.weather, cell_weather=env.cell_weather, env=env, verbose=not headless,
+                    planning_steps=planning_steps)
     
-    # Ensure Qtable always has the full 12x12 grid states (144) plus 'finished'
-    def _load_full_qtable(agent, env):
-        states = []
-        for c in range(env.gridNum):
-            for r in range(env.gridNum):
-                x0, y0 = c * env.gridWidth, r * env.gridWidth
-                x1, y1 = (c + 1) * env.gridWidth, (r + 1) * env.gridWidth
-                states.append(f"[{x0}.0, {y0}.0, {x1}.0, {y1}.0]")
-        states.append('finished')
-
-        full_q = pd.DataFrame(0.0, index=states, columns=range(env.actions_num))
-        path = os.path.join(SCRIPT_DIR, "Qtable.csv")
+    # The Q-table always holds the full grid (144 cells for 12x12) plus 'finished'; load saved values if present,
+    # preferring the binary checkpoint over the legacy CSV. A checkpoint from another layout or grid size is
+    # warm-started: only the states the change affects are re-evaluated (see Transfer.py)
+    import Transfer
+    from Scenario import Scenario
+    def load_transferred(path):
+        old_layout = Scenario.load(LAYOUT_PATH) if os.path.exists(LAYOUT_PATH) else None
+        Transfer.load_checkpoint(MyAgent, path, old_env=old_layout)
+    for path, load in ((CHECKPOINT_PATH, load_transferred), (QTABLE_PATH, MyAgent.load_csv)):
         if os.path.exists(path):
             try:
-                loaded = pd.read_csv(path, index_col=0)
-                loaded = loaded.reindex(columns=range(env.actions_num)).fillna(0.0)
-                for idx in loaded.index:
-                    if idx in full_q.index:
-                        full_q.loc[idx] = loaded.loc[idx]
+                load(path)
+                break
             except Exception:
                 pass
-
-        agent.q_table = full_q
-
-    _load_full_qtable(MyAgent, env)
-    env.after(10, start)
-
-    # Start main loop
-    env.mainloop()
+    Scenario.from_world(world).save(LAYOUT_PATH)
+    if warm:
+        from Planner import warm_start
+        warm_start(MyAgent, env)
+
+    if headless:
+        start(env, MyAgent, instrumentation=instrumentation)
+        # Pass --export-policy to compile the trained Q-table into policy.npz for Policy.py queries
+        if '--export-policy' in sys.argv[1:]:
+            from Policy import Policy
+            Policy.from_agent(MyAgent, world).save(POLICY_PATH)
+    else:
+        env.renderer.after(10, lambda: start(env, MyAgent, instrumentation=instrumentation))
+        # Start main loop
+        env.renderer.mainloop()
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pytest
+
+import Checkpoint
+from QTable import TiledQTable
+
+
+def test_flush_writes_the_latest_request(tmp_path):
+    path = str(tmp_path / 'q.bin')
+    q_table = np.zeros((17, 4))
+    writer = Checkpoint.AsyncCheckpointer(path, 4, 80)
+    for value in range(50):
+        q_table[:] = value
+        writer.request(q_table)
+    writer.flush()
+    assert (Checkpoint.load(path)[0] == 49).all()
+    assert 1 <= writer.writes <= 50
+    writer.close()
+    with pytest.raises(ValueError):
+        writer.request(q_table)
+
+
+def test_tiled_table_is_copied_at_request(tmp_path):
+    path = str(tmp_path / 'q.bin')
+    q_table = TiledQTable(10, 4, tile=4)
+    q_table[3, 1] = 1.0
+    q_table[q_table.shape[0] - 1] = 2.0
+    expected = q_table.to_dense()
+    writer = Checkpoint.AsyncCheckpointer(path, 10, 80)
+    writer.request(q_table)
+    q_table[3, 1] = 5.0
+    q_table[99, 0] = 5.0
+    writer.close()
+    assert np.array_equal(Checkpoint.load(path)[0], expected)
+
+
+def test_write_errors_surface_from_flush(tmp_path):
+    writer = Checkpoint.AsyncCheckpointer(str(tmp_path / 'missing' / 'q.bin'), 4, 80)
+    writer.request(np.zeros((17, 4)))
+    with pytest.raises(OSError):
+        writer.flush()
+    writer.close()
+    assert not os.path.exists(tmp_path / 'missing')
@@ -0,0 +1,44 @@
+import numpy as np
+from World import GridWorld
+from Fleet import FleetWorld, FleetTrainer
+
+
+def make_world():
+    # Open 12x12 grid with one bird parked in the far corner
+    return GridWorld(building_mask=np.zeros((12, 12), dtype=bool), birds=[[11, 11]], bird_every=10 ** 9, bird_seed=0)
+
+
+def test_conflict_chain_sends_every_drone_back():
+    # Drones 0 and 1 both enter (2, 0) and go back; drone 0 then blocks drone 2, which moved into (1, 0)
+    fleet = FleetWorld(make_world(), starts=[(1, 0), (3, 0), (0, 0)], goals=[(5, 5), (6, 6), (7, 7)])
+    _, _, _, _, conflict = fleet.step(np.array([3, 2, 3]))
+    assert fleet.cells().tolist() == [[1, 0], [3, 0], [0, 0]]
+    assert conflict.tolist() == [True, True, True]
+
+
+def test_convoy_behind_a_stopped_leader_stays_put():
+    # Every drone moves right into the cell of the one ahead; the leader at the grid edge cannot move, so the
+    # whole convoy is sent back, one returned drone at a time
+    world = GridWorld(gridNum=500, building_mask=np.zeros((500, 500), dtype=bool), birds=[[0, 499]],
+                      bird_every=10 ** 9, bird_seed=0)
+    starts = [(col, 0) for col in range(500)]
+    fleet = FleetWorld(world, starts=starts, goals=[(col, 5) for col in range(500)])
+    _, _, _, _, conflict = fleet.step(np.full(500, 3))
+    assert fleet.cells().tolist() == [list(cell) for cell in starts]
+    assert conflict.all()
+    assert (fleet._dest == -1).all()
+
+
+def test_swap_is_a_conflict():
+    fleet = FleetWorld(make_world(), starts=[(1, 0), (2, 0)], goals=[(5, 5), (6, 6)])
+    _, _, _, _, conflict = fleet.step(np.array([3, 2]))
+    assert fleet.cells().tolist() == [[1, 0], [2, 0]]
+    assert conflict.tolist() == [True, True]
+
+
+def test_train_counts_steps_taken():
+    fleet = FleetWorld(make_world(), starts=[(0, 0)], goals=[(0, 1)])
+    trainer = FleetTrainer(fleet, epsilon=0.0, seed=0)
+    trainer.q_tables[0, 0, 1] = 1.0  # down from (0, 0) reaches the goal
+    assert trainer.train(episodes=1)['steps'].tolist() == [1]
+    assert trainer.train(episodes=1, max_steps=0)['steps'].tolist() == [0]
@@ -0,0 +1,25 @@
+import numpy as np
+
+from Hazards import BirdScheduler
+
+
+def test_counts_hold_hundreds_of_birds_on_one_cell():
+    birds = BirdScheduler(12, [[5, 5]] * 256, seed=0)
+    assert birds.occupied[5 * 12 + 5] == 256
+    assert birds.adjacent[5 * 12 + 4] == 256
+    birds.move()
+    birds.set_positions([[0, 0]] * 256)
+    assert birds.occupied[0] == 256 and sum(birds.occupied) == 256
+    # (0, 0) has two neighbours inside the grid
+    assert birds.adjacent[1] == birds.adjacent[12] == 256 and sum(birds.adjacent) == 512
+
+
+def test_clone_replays_the_same_moves():
+    birds = BirdScheduler(12, [[0, 0], [11, 11], [5, 5]], move_every=1, seed=3)
+    other = birds.clone()
+    for _ in range(100):
+        birds.tick()
+        other.tick()
+    assert (birds.positions == other.positions).all()
+    assert ((birds.positions >= 0) & (birds.positions < 12)).all()
+    assert np.array_equal(birds.occupied_array, other.occupied_array)
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from World import GridWorld
+from Policy import Policy
+
+
+def make_policy():
+    world = GridWorld(building_mask=np.zeros((12, 12), dtype=bool), birds=[[11, 11]], bird_seed=0)
+    return Policy.from_q_table(np.random.default_rng(0).random((world.finished_index + 1, 4)), world)
+
+
+@pytest.mark.parametrize('cell', [(-1, 0), (0, -1), (12, 0), (0, 12)])
+def test_queries_reject_cells_outside_the_grid(cell):
+    policy = make_policy()
+    with pytest.raises(ValueError):
+        policy.next_action(cell)
+    with pytest.raises(ValueError):
+        policy.next_actions([cell])
+    with pytest.raises(ValueError):
+        policy.route(start=cell)
+    with pytest.raises(ValueError):
+        policy.route(goal=cell)
+
+
+def test_next_actions_match_next_action():
+    policy = make_policy()
+    cells = [(0, 0), (3, 7), (11, 11)]
+    assert policy.next_actions(cells).tolist() == [policy.next_action(c) for c in cells]